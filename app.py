@@ -5,139 +5,30 @@ from streamlit_lottie import st_lottie
 import requests
 import os
 
-from utils import fetch_smart_candidates, fetch_extended_details, fetch_trending
-from recommender import ContentEngine, load_data
+from utils import stream_smart_candidates, fetch_extended_details, fetch_trending, prefetch_details, _process_results, cached_poster, details_pending, fill_posters
+import core
+from classics_pool import ClassicsPool
+from prompts import SURPRISE_PROMPTS
+from metrics import METRICS, observe, span
+from results import Card, compact, payload
+from query_cache import RESULTS, Prewarmer
+from scheduler import PRIORITY_BULK, PRIORITY_USER
+import rerun_budget
+from warmup import Resource, Warmup
+
+# Imports are cached after the first run, so this is ~ the start of the rerun
+RERUN_STARTED = time.perf_counter()
 
 # --- CONFIG & STYLES ---
 st.set_page_config(page_title="Lumina", page_icon="🎬", layout="wide", initial_sidebar_state="expanded")
 
-st.markdown("""
-<style>
-    /* 1. BACKGROUND */
-    .stApp {
-        background: radial-gradient(circle at center, #1e1e2f 0%, #0f0f0f 100%);
-        color: #ffffff;
-    }
-    
-    /* 2. GLASSMORPHISM */
-    .movie-card {
-        background: rgba(255, 255, 255, 0.05);
-        backdrop-filter: blur(10px);
-        border-radius: 12px;
-        padding: 10px;
-        margin-bottom: 20px;
-        border: 1px solid rgba(255, 255, 255, 0.1);
-        transition: transform 0.3s cubic-bezier(0.25, 0.8, 0.25, 1), box-shadow 0.3s ease;
-        position: relative;
-        overflow: hidden;
-    }
-    
-    .movie-card:hover {
-        transform: scale(1.05);
-        box-shadow: 0 0 15px rgba(0, 255, 255, 0.4);
-        border-color: rgba(0, 255, 255, 0.5);
-        z-index: 10;
-    }
-    
-    /* TEXT STYLES */
-    .movie-title {
-        font-family: 'Helvetica Neue', sans-serif;
-        font-weight: 700;
-        font-size: 0.95rem;
-        color: #fff;
-        margin-top: 8px;
-        height: 40px;
-        overflow: hidden;
-        display: -webkit-box;
-        -webkit-line-clamp: 2;
-        -webkit-box-orient: vertical;
-        text-shadow: 0 2px 4px rgba(0,0,0,0.5);
-    }
-    
-    .rating-text {
-        color: #aaa;
-        font-size: 0.75rem;
-        margin-top: 4px;
-        display: flex;
-        align-items: center;
-        gap: 5px;
-    }
-    
-    /* 4. BUTTONS */
-    .stButton button {
-        background: linear-gradient(135deg, #6a11cb 0%, #2575fc 100%) !important;
-        color: white !important;
-        border: none !important;
-        border-radius: 8px;
-        padding: 6px 15px;
-        font-size: 0.9rem;
-        font-weight: 600;
-        transition: all 0.3s ease;
-    }
-    .stButton button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 4px 15px rgba(37, 117, 252, 0.5);
-        filter: brightness(1.2);
-    }
-    
-    /* CLEANUP */
-    #MainMenu {visibility: hidden;}
-    footer {visibility: hidden;}
-    
-    /* CUSTOM HERO TITLE */
-    .hero-title {
-        font-family: 'Arial Black', sans-serif;
-        font-size: 4rem; 
-        font-weight: 900;
-        letter-spacing: 5px;
-        text-transform: uppercase;
-        background: -webkit-linear-gradient(top, #fff, #aaa);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        margin-bottom: 0px;
-        text-shadow: 0 5px 20px rgba(0,0,0,0.5);
-        line-height: 1;
-    }
-    
-    .hero-subtitle {
-        font-size: 1.1rem;
-        color: #ccc;
-        letter-spacing: 2px;
-        text-transform: uppercase;
-        margin-top: 5px;
-    }
-    
-    .stTextInput > div > div > input {
-        background-color: rgba(0, 0, 0, 0.3);
-        color: white;
-        border: 1px solid rgba(255, 255, 255, 0.2);
-        border-radius: 30px;
-        padding: 10px 20px;
-        text-align: center;
-        transition: border-color 0.3s;
-    }
-    .stTextInput > div > div > input:focus {
-        border-color: #2575fc;
-        box-shadow: 0 0 10px rgba(37, 117, 252, 0.3);
-    }
-</style>
-""", unsafe_allow_html=True)
-
-# --- INITIALIZATION & DATA LOADING ---
-# 1. LOAD DATA (Cached in-memory resources)
 @st.cache_resource
-def get_cached_data():
-    return load_data()
+def load_css(path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "style.css")):
+    """Static stylesheet, read from disk once per process."""
+    with open(path, encoding="utf-8") as f:
+        return f"<style>\n{f.read()}</style>"
 
-try:
-    movies_df, embeddings = get_cached_data()
-except Exception as e:
-    st.error(f"Error loading data: {e}")
-    st.stop()
-
-@st.cache_resource
-def get_engine(): return ContentEngine(embeddings=embeddings)
-engine = get_engine()
+st.markdown(load_css(), unsafe_allow_html=True)
 
 # --- SECURITY ---
 try: api_key = st.secrets["TMDB_API_KEY"]
@@ -147,17 +38,155 @@ if not api_key:
     st.error("⚠️ Security Error: TMDB_API_KEY not found in secrets.")
     st.stop()
 
+# --- INITIALIZATION & DATA LOADING ---
+# Heavy resources load on background threads (once per process), so the trending
+# page paints immediately. Anything that needs them waits instead of reloading.
+@st.cache_resource
+def get_warmup(api_key):
+    data = Resource("data", core.load_data)
+    model = Resource("model", core.load_model)
+    engine = Resource(
+        "engine",
+        lambda d, m: core.ContentEngine(embeddings=d[1], movies_df=d[0], model_loader=lambda name: m),
+        deps=(data, model)
+    )
+    # Background Deep History pool (pre-encoded, refreshed on a timer)
+    classics = Resource("classics_pool", lambda e: ClassicsPool(api_key, e).start(), deps=(engine,))
+    return Warmup(data, model, engine, classics)
+warmup = get_warmup(api_key).start() # also re-runs a failed resource once its backoff is up
+
+def _report_load_error(e):
+    if isinstance(e, core.DataFileMissing):
+        st.error(f"🚨 Critical Error: {e}")
+        st.info(f"ℹ️ {e.hint}")
+    else:
+        st.error(f"Error loading data: {e}")
+    st.stop()
+
+if warmup["data"].failed: _report_load_error(warmup["data"].error)
+
+def get_engine():
+    """The warm engine; a search submitted during warm-up waits here."""
+    resource = warmup["engine"]
+    if not resource.ready:
+        with st.spinner("🔥 Warming up the engine..."):
+            try: resource.wait()
+            except Exception as e: _report_load_error(e)
+    return resource.value
+
+def get_classics_snapshot():
+    pool = warmup["classics_pool"]
+    return pool.value.snapshot() if pool.ready else None
+
+# --- SEARCH PIPELINE ---
+GRID_SIZE = 20 # cards shown per page
+def run_search(query, safe_search, on_update=None, priority=PRIORITY_USER, fresh=False):
+    """
+    Progressive search: TMDB fan-out + local recall (tmdb_5000 index) + classics pool,
+    ranked incrementally. Direct search and local hits rank first, keyword discover pages
+    refine the same top-k as they land; on_update(ranked) fires after every batch.
+    Rankings are cached per (query, Safe Search) and reused for near-identical queries
+    (query_cache.py); fresh=True recomputes and replaces the entry.
+    """
+    engine = get_engine()
+    cacheable = bool(query and query.strip())
+    query_vector = lambda: engine.encode_query(query)[0] # cached by the engine, local recall needs it too
+    if cacheable and not fresh:
+        cached = RESULTS.get(query, safe_search, query_vector)
+        if cached is not None: return cached
+    started = time.perf_counter()
+    with span("search_total"):
+        pool = get_classics_snapshot()
+        ranker = core.IncrementalRanker(engine, query, k=GRID_SIZE, known_vectors=pool.vectors if pool else None)
+
+        painted = False
+
+        def add(batch, stand_in=False):
+            nonlocal painted
+            if not batch: return
+            with span("rank"):
+                ranked = ranker.add(batch, stand_in)
+            if on_update:
+                if not painted: observe("search_first_paint_seconds", time.perf_counter() - started)
+                painted = True
+                on_update(ranked)
+
+        with span("local_recall"):
+            # Local recall keeps working if TMDB is slow / rate-limiting
+            local_hits = _process_results(engine.search_local(query), safe_search)
+        # Until the pool's first refresh lands, fetch Deep History inline like before
+        stream = stream_smart_candidates(api_key, safe_search, query, include_history=pool is None, priority=priority)
+        with span("tmdb_fanout"):
+            for source, batch in stream:
+                add(batch)
+                if source == "search" and local_hits is not None:
+                    # FIRST PAINT: direct search, then the local index + pre-encoded pool.
+                    # Local rows are stand-ins: a later TMDB copy (posters) takes over their payload
+                    add(local_hits, stand_in=True)
+                    if pool: add(_process_results(pool.movies, safe_search))
+                    local_hits = None
+        if local_hits is not None: # no direct search this time
+            add(local_hits, stand_in=True)
+            if pool: add(_process_results(pool.movies, safe_search))
+
+        # LOG POOL SIZE
+        print(f"POOL SIZE: {len(ranker.seen)}")
+        results = ranker.results()
+        with span("poster_fill"):
+            # Local-only hits never got a TMDB copy: cached posters now, the rest in the background
+            results = fill_posters(results, api_key, priority)
+    if cacheable: RESULTS.put(query, safe_search, results, query_vector())
+    return results
+
+# SURPRISE ME: every prompt ranked in the background (Safe Search on, the default), at
+# BULK priority so real searches go first, and re-ranked before the cache drops it
+@st.cache_resource
+def get_prewarmer(api_key):
+    return Prewarmer(
+        SURPRISE_PROMPTS,
+        lambda q: run_search(q, True, priority=PRIORITY_BULK, fresh=True),
+        after=warmup["engine"],
+    ).start()
+get_prewarmer(api_key)
+
+SIMILAR_K = 2 * GRID_SIZE # slack for the Safe Search filter
+def more_like_this(card, safe_search):
+    """Neighbours of a movie from the precomputed embeddings: no TMDB call, no encode."""
+    engine = get_engine()
+    with span("more_like_this"):
+        hits = engine.similar(payload(card) or {"id": card.id}, k=SIMILAR_K)
+        # Copies seen in earlier results carry TMDB posters; catalog rows don't
+        hits = [{**hit, **payload(hit['id']), 'match_score': hit['match_score']} for hit in hits]
+        return fill_posters(_process_results(hits, safe_search)[:GRID_SIZE], api_key)
+
 # --- STATE MANAGEMENT ---
+# results holds compact Cards (results.py), never the raw TMDB dicts
 if 'search_query' not in st.session_state: st.session_state.search_query = ""
-if 'results' not in st.session_state: st.session_state.results = []
+if 'results' not in st.session_state: st.session_state.results = ()
 if 'trigger_random' not in st.session_state: st.session_state.trigger_random = False
+if 'similar_to' not in st.session_state: st.session_state.similar_to = None # Card behind "More like this"
+
+# --- FRAGMENT RERUNS ---
+# Streamlit runs every full rerun in a fresh module namespace, and a fragment rerun calls
+# the function from the previous (finished) run, whose namespace already has SCRIPT_DONE.
+def is_fragment_rerun():
+    return globals().get("SCRIPT_DONE", False)
+
+def full_rerun(interaction):
+    """st.rerun() the whole app, tagged for the rerun budget."""
+    st.session_state.interaction = interaction
+    st.rerun()
 
 # --- SIDEBAR ---
-with st.sidebar:
+# A fragment: the debug panel reruns only the sidebar; anything that changes the
+# results re-ranks here and then asks for exactly one full rerun.
+@st.fragment
+def sidebar():
+    started = time.perf_counter()
     st.header("⚙️ Settings")
     
     # INSTANT RERUN SAFESEARCH
-    # Link widget directly to state key for persistence + rerun callback
+    # Link widget directly to state key for persistence
     safe_search = st.toggle("🛡️ Safe Search", value=True, key="safe_search_toggle")
     
     # STATE WATCHER: INSTANT SYNC FIX
@@ -168,76 +197,85 @@ with st.sidebar:
     if st.session_state.last_safe_search != safe_search:
         st.session_state.last_safe_search = safe_search
         
+        # "More like this" grid: re-filter the same neighbours
+        if st.session_state.similar_to:
+            st.session_state.results = compact(more_like_this(st.session_state.similar_to, safe_search), GRID_SIZE)
         # If there is text in the search bar, re-run the search immediately
-        if st.session_state.search_query:
+        elif st.session_state.search_query:
             with st.spinner("Refiltering results..."):
-                st.cache_data.clear()
-                # Re-fetch candidates with the new safe_search setting
-                # Note: Correct arg order is (api_key, safe_search, query)
-                candidates = fetch_smart_candidates(api_key, safe_search, st.session_state.search_query)
-                if candidates:
-                    st.session_state.results = engine.rank_candidates(candidates, st.session_state.search_query)
-                else:
-                    st.session_state.results = []
+                # Raw TMDB pages are cached, Safe Search is applied on top -> no network here
+                st.session_state.results = compact(run_search(st.session_state.search_query, safe_search), GRID_SIZE)
         else:
             # If no query, just clear results
-            st.session_state.results = []
-            st.cache_data.clear()
+            st.session_state.results = ()
             
-        st.rerun()
+        full_rerun("safe_search")
     
     st.markdown("---")
     
     # NAVIGATION
     if st.button("🏠 Back to Trending"):
         st.session_state.search_query = ""
-        st.session_state.results = []
-        st.rerun()
+        st.session_state.similar_to = None
+        st.session_state.results = ()
+        full_rerun("navigation")
         
     st.write("") # Spacer
 
     if st.button("🎲 Surprise Me"):
-        # THE ELITE 25 LIST
-        PROMPTS = [
-            "A movie where the setting feels like a character itself",
-            "Technicolor dreams and 80s synth-wave vibes",
-            "Movies that feel like a warm hug on a rainy Sunday",
-            "Something that will make me question my own reality",
-            "Visually stunning masterpieces with very little dialogue",
-            "A gritty story of redemption in a cold city",
-            "Movies about the beauty and terror of the deep ocean",
-            "Mind-bending puzzles that require a second viewing",
-            "The feeling of being lost in a massive, futuristic metropolis",
-            "Small-town mysteries with a dark, supernatural undertone",
-            "Heartbreaking stories about the passage of time",
-            "High-stakes heist movies with a sophisticated plan",
-            "Something to watch when I want to feel inspired to change the world",
-            "Isolation in space where silence is the loudest sound",
-            "Coming-of-age stories that feel painfully nostalgic",
-            "Dark comedies that make you laugh at things you shouldn't",
-            "Epic historical journeys across vast, beautiful landscapes",
-            "The chaotic energy of a high-pressure kitchen or workplace",
-            "Quiet movies about a simple life in the countryside",
-            "Cyberpunk aesthetics and the blurred line between man and machine",
-            "Psychological thrillers where the protagonist is unreliable",
-            "A movie that captures the feeling of a long, lonely road trip",
-            "Vibrant animation that feels like a living painting",
-            "Stories of unexpected friendship in impossible circumstances",
-            "A movie that feels like a slow-burn fever dream"
-        ]
-        st.session_state.search_query = random.choice(PROMPTS)
+        st.session_state.search_query = random.choice(SURPRISE_PROMPTS)
         st.session_state.trigger_random = True 
-        st.rerun()
+        full_rerun("search")
+
+    if not warmup.ready:
+        loading = [name for name, state in warmup.status().items() if state == "loading"]
+        if loading: st.caption(f"⏳ Warming up: {', '.join(loading)}")
+
+    # DEBUG PANEL (operators only: LUMINA_DEBUG=1)
+    if os.getenv("LUMINA_DEBUG") and st.toggle("🔬 Pipeline Metrics", value=False):
+        snap = METRICS.snapshot()
+        st.caption(f"Warm-up: {warmup.status()}")
+        st.caption("Rerun latency vs budget (ms)")
+        st.dataframe(rerun_budget.report(), hide_index=True)
+        st.caption("Latency per stage (ms, rolling window)")
+        st.dataframe([
+            {"metric": h.get("stage") or h.get("endpoint") or h.get("resource") or h["name"], "n": h["count"],
+             "p50": round(h["p50"] * 1000, 1), "p95": round(h["p95"] * 1000, 1), "p99": round(h["p99"] * 1000, 1)}
+            for h in snap["histograms"] if h["name"].endswith("_seconds") and h["name"] != "rerun_seconds"
+        ], hide_index=True)
+        st.caption("Counters & gauges")
+        st.json({**snap["counters"], **snap["gauges"]}, expanded=False)
+        st.download_button("⬇️ Prometheus dump", METRICS.prometheus_text(), file_name="lumina_metrics.prom")
+
+    if is_fragment_rerun(): rerun_budget.record("sidebar", time.perf_counter() - started)
+
+with st.sidebar:
+    sidebar()
+safe_search = st.session_state.safe_search_toggle
 
 # --- HERO ---
+LOTTIE_URL = "https://assets2.lottiefiles.com/private_files/lf30_bb9bkg1h.json"
+LOTTIE_RETRY = 300 # seconds a session goes without the animation after a failed fetch
+
+@st.cache_data(ttl=24 * 3600, show_spinner=False)
+def load_lottie(url):
+    """Hero animation JSON, fetched once per day per process. Raises on failure (never cached)."""
+    r = requests.get(url, timeout=3)
+    r.raise_for_status()
+    return r.json()
+
 col_hero_1, col_hero_2 = st.columns([1, 2])
 with col_hero_1:
-    lottie_url = "https://assets2.lottiefiles.com/private_files/lf30_bb9bkg1h.json"
-    try:
-        r = requests.get(lottie_url)
-        if r.status_code == 200:
-            st_lottie(r.json(), height=160, key="hero_anim")
-    except: pass
+    hero_anim = None
+    if time.time() >= st.session_state.get("lottie_retry_at", 0):
+        try:
+            hero_anim = load_lottie(LOTTIE_URL)
+        except Exception as e:
+            # Skip it for a while, not for a day: the next rerun after the backoff fetches again
+            print(f"⚠️ Hero animation unavailable: {e}")
+            st.session_state.lottie_retry_at = time.time() + LOTTIE_RETRY
+    if hero_anim:
+        st_lottie(hero_anim, height=160, key="hero_anim")
 with col_hero_2:
     st.markdown("<h1 class='hero-title'>LUMINA</h1>", unsafe_allow_html=True)
     st.markdown("<div class='hero-subtitle'>Stop Scrolling. Start Watching.</div>", unsafe_allow_html=True)
@@ -254,99 +292,145 @@ with st.container():
         with col2:
              submit_btn = st.form_submit_button("🔍")
 
+# --- CARDS ---
+POSTER_POLL = 1.0 # seconds between checks of a poster still being fetched
+
+def render_poster(card):
+    poster = card.poster or cached_poster(card.id)
+    if poster:
+        st.image(poster, width="stretch")
+    else:
+        st.markdown('<div style="width:100%; height:250px; background:rgba(0,0,0,0.5); border-radius:8px;"></div>', unsafe_allow_html=True)
+
+# Only the placeholder reruns while the fetch is in flight (not the card, its button or dialog)
+@st.fragment(run_every=POSTER_POLL)
+def pending_poster(card):
+    render_poster(card)
+
+def render_card(card, poll=False):
+    """Poster + title / rating card (live preview and final grid)."""
+    if poll and not (card.poster or cached_poster(card.id)) and details_pending(card.id):
+        pending_poster(card)
+    else:
+        render_poster(card)
+    
+    # RENDER CARD: Star Rating & Year
+    st.markdown(f"""
+    <div class="movie-card">
+        <div class="movie-title">{card.title}</div>
+        <div class="rating-text">
+            <span>⭐ {card.rating:.1f}</span>
+            <span>•</span>
+            <span>{card.year}</span>
+        </div>
+    </div>
+    """, unsafe_allow_html=True)
+
+def render_preview(placeholder, movies):
+    """Redraw the in-progress grid in place (no buttons: widget keys must stay unique per run)."""
+    with placeholder.container():
+        cols = st.columns(5)
+        for i, movie in enumerate(movies[:GRID_SIZE]):
+            with cols[i % 5]: render_card(Card.from_movie(movie))
+
 # --- LOGIC ---
 should_search = submit_btn or st.session_state.trigger_random
 
 if should_search:
     # 1. RESET STATE
-    st.cache_data.clear() 
-    st.session_state.results = []
+    st.session_state.results = ()
     
     st.session_state.search_query = user_query
+    st.session_state.similar_to = None
     st.session_state.trigger_random = False 
     
     results_container = st.empty()
-    with results_container.container():
-        with st.spinner("✨ Lumina is finding your vibe..."):
-            # Use SMART FETCH
-            candidates = fetch_smart_candidates(api_key, safe_search, st.session_state.search_query)
-            
-            # 2. LOG POOL SIZE
-            print(f"POOL SIZE: {len(candidates)}")
-            
-            # Rank
-            ranked = engine.rank_candidates(candidates, st.session_state.search_query)
-            st.session_state.results = ranked
+    with st.spinner("✨ Lumina is finding your vibe..."):
+        # Use SMART FETCH + local recall, ranked as sources land; the grid refines in place
+        st.session_state.results = compact(run_search(
+            st.session_state.search_query, safe_search,
+            on_update=lambda ranked: render_preview(results_container, ranked)
+        ), GRID_SIZE)
+    results_container.empty() # the interactive grid below takes over
 
 # --- DISPLAY ---
-if not st.session_state.results and not st.session_state.search_query:
-    st.session_state.results = fetch_trending(api_key, safe_search)
+similar_to = st.session_state.similar_to
+if similar_to:
+    st.markdown(f"### ✨ More like {similar_to.title}")
+if not st.session_state.results and not st.session_state.search_query and not similar_to:
+    st.session_state.results = compact(fetch_trending(api_key, safe_search), GRID_SIZE)
     st.markdown("### 🔥 Trending Globally")
 elif not st.session_state.results:
-    if safe_search and st.session_state.search_query:
+    if safe_search and (st.session_state.search_query or similar_to):
          st.warning("⚠️ High-intensity content filtered. Try toggling Safe Search off if you are looking for specific gritty thrillers.")
     else:
          st.info("No close vibe matches found. Try loosening your filters!")
 
+# --- DETAILS DIALOG ---
+@st.dialog("Movie Details", width="large")
+def show_details(card):
+    with st.spinner("Loading..."):
+        d = fetch_extended_details(card.id, api_key)
+    
+    # BEAUTIFUL DETAILS LAYOUT
+    if d:
+        st.title(d.get('title', card.title))
+        if d.get('tagline'):
+            st.caption(f"_{d['tagline']}_")
+        
+        st.divider()
+        
+        c1, c2 = st.columns([1, 2])
+        with c1:
+            poster = card.poster or d.get('poster_path_full')
+            if poster:
+                st.image(poster, width="stretch")
+        with c2:
+            st.markdown("### Synopsis")
+            st.write(d.get('overview') or payload(card).get('overview', ''))
+            
+            st.markdown("---")
+            
+            # METADATA GRID
+            mc1, mc2, mc3 = st.columns(3)
+            with mc1: st.metric("Rating", f"⭐ {d.get('vote_average', card.rating):.1f}")
+            with mc2: st.metric("Year", card.year)
+            with mc3: st.metric("Runtime", f"{d.get('runtime', 'N/A')} min")
+        
+        if d.get('cast'):
+            st.info(f"**Starring:** {', '.join(d['cast'])}")
+
+    # MORE LIKE THIS: straight from the embedding matrix, replaces the grid
+    if st.button("✨ More like this", key=f"similar_{card.id}"):
+        st.session_state.similar_to = card
+        st.session_state.results = compact(more_like_this(card, st.session_state.safe_search_toggle), GRID_SIZE)
+        full_rerun("similar")
+
+# --- GRID ---
+# One fragment per card: "Details" reruns that card only (no search, no grid walk)
+@st.fragment
+def card_tile(card):
+    started = time.perf_counter()
+    render_card(card, poll=True)
+    if st.button("Details", key=f"btn_{card.id}"):
+        show_details(card)
+        rerun_budget.record("details", time.perf_counter() - started)
+
 if st.session_state.results:
+    # Details for every card on screen load in the background -> instant dialogs.
+    # Missing posters go first: they are on screen now, the dialogs may never open
+    shown = st.session_state.results[:GRID_SIZE]
+    prefetch_details([card.id for card in shown if not card.poster], api_key, PRIORITY_USER)
+    prefetch_details([card.id for card in shown], api_key)
+    
     with st.container():
         cols = st.columns(5)
-        for i, movie in enumerate(st.session_state.results[:20]): # Show Top 20
-            col = cols[i % 5]
-            with col:
-                poster = movie.get('poster_path_full')
-                if poster:
-                    st.image(poster, width="stretch")
-                else:
-                    st.markdown('<div style="width:100%; height:250px; background:rgba(0,0,0,0.5); border-radius:8px;"></div>', unsafe_allow_html=True)
-                
-                # INFO: Star Rating & Year
-                rating = movie.get('vote_average', 0)
-                year = movie.get('release_date', 'N/A')[:4]
-                
-                # RENDER CARD
-                st.markdown(f"""
-                <div class="movie-card">
-                    <div class="movie-title">{movie['title']}</div>
-                    <div class="rating-text">
-                        <span>⭐ {rating:.1f}</span>
-                        <span>•</span>
-                        <span>{year}</span>
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                if st.button("Details", key=f"btn_{movie['id']}"):
-                    @st.dialog("Movie Details", width="large")
-                    def show_details():
-                        with st.spinner("Loading..."):
-                            d = fetch_extended_details(movie['id'], api_key)
-                        
-                        # BEAUTIFUL DETAILS LAYOUT
-                        if d:
-                            st.title(d.get('title', movie['title']))
-                            if d.get('tagline'):
-                                st.caption(f"_{d['tagline']}_")
-                            
-                            st.divider()
-                            
-                            c1, c2 = st.columns([1, 2])
-                            with c1:
-                                if movie.get('poster_path_full'):
-                                    st.image(movie['poster_path_full'], width="stretch")
-                            with c2:
-                                st.markdown("### Synopsis")
-                                st.write(d.get('overview', movie.get('overview', '')))
-                                
-                                st.markdown("---")
-                                
-                                # METADATA GRID
-                                mc1, mc2, mc3 = st.columns(3)
-                                with mc1: st.metric("Rating", f"⭐ {d.get('vote_average', rating):.1f}")
-                                with mc2: st.metric("Year", year)
-                                with mc3: st.metric("Runtime", f"{d.get('runtime', 'N/A')} min")
-                            
-                            if d.get('cast'):
-                                st.info(f"**Starring:** {', '.join(d['cast'])}")
-                            
-                    show_details()
+        for i, card in enumerate(st.session_state.results[:GRID_SIZE]): # Show Top 20
+            with cols[i % 5]:
+                card_tile(card)
+
+# --- RERUN COST ---
+interaction = st.session_state.pop("interaction", None) or ("search" if should_search else "page")
+rerun_budget.record(interaction, time.perf_counter() - RERUN_STARTED)
+warmup.mark_first_paint()
+SCRIPT_DONE = True # see is_fragment_rerun()
@@ -0,0 +1,94 @@
+"""
+Encoder backend comparison: throughput and ranking quality vs the float torch baseline.
+
+    python -m benchmarks.bench_encoders --backends torch torch-int8 onnx --rows 2000 --threads 4
+
+Ranking quality is the overlap of each query's top-20 (over the same corpus) with the
+baseline's top-20, plus the mean cosine between each backend's vectors and the baseline's.
+The corpus is tmdb_5000_movies.csv when present, otherwise synthetic stub movies.
+"""
+import argparse
+import os
+import random
+import time
+
+import numpy as np
+
+from benchmarks.bench_search import QUERIES
+from benchmarks.tmdb_stub import _fake_movie
+from core import MODEL_NAME, compose_text, top_k
+from encoders import BACKENDS, make_encoder
+
+TOP = 20
+
+
+def load_corpus(rows, seed=0):
+    if os.path.exists("tmdb_5000_movies.csv"):
+        import pandas as pd
+        from vector_index import movies_from_frame
+
+        movies = list(movies_from_frame(pd.read_csv("tmdb_5000_movies.csv")).values())
+        random.Random(seed).shuffle(movies)
+        movies = movies[:rows]
+    else:
+        rng = random.Random(seed)
+        movies = [_fake_movie(rng, i) for i in range(rows)]
+    return [compose_text(m) for m in movies]
+
+
+def normalize(m):
+    return m / np.maximum(np.linalg.norm(m, axis=1, keepdims=True), 1e-12)
+
+
+def run_backend(backend, corpus, args):
+    started = time.perf_counter()
+    encoder = make_encoder(MODEL_NAME, backend, batch_size=args.batch_size, max_seq_length=args.max_seq, threads=args.threads)
+    load_seconds = time.perf_counter() - started
+
+    encoder.encode(corpus[:args.batch_size]) # warm-up (allocations, lazy graph init)
+    started = time.perf_counter()
+    docs = normalize(encoder.encode(corpus))
+    encode_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    queries = normalize(np.vstack([encoder.encode([q]) for q in QUERIES]))
+    query_ms = (time.perf_counter() - started) / len(QUERIES) * 1000
+
+    rankings = [set(top_k(row, TOP)[0].tolist()) for row in queries @ docs.T]
+    return {
+        "load_s": load_seconds,
+        "rows_per_s": len(corpus) / encode_seconds,
+        "query_ms": query_ms,
+        "docs": docs,
+        "rankings": rankings,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--max-seq", type=int, default=None)
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.rows)
+    results = {}
+    for backend in dict.fromkeys(["torch"] + args.backends): # baseline always first
+        try:
+            results[backend] = run_backend(backend, corpus, args)
+        except ImportError as e:
+            print(f"⚠️ Skipping {backend}: {e}")
+
+    base = results.get("torch")
+    print(f"\n{len(corpus)} rows, batch {args.batch_size}, max_seq {args.max_seq or 'model default'}, threads {args.threads or 'default'}")
+    print(f"{'backend':<12}{'load s':>8}{'rows/s':>10}{'query ms':>10}{'top20 overlap':>15}{'vec cosine':>12}")
+    for backend, r in results.items():
+        overlap = np.mean([len(a & b) / TOP for a, b in zip(r["rankings"], base["rankings"])]) if base else float("nan")
+        cosine = float(np.mean(np.sum(r["docs"] * base["docs"], axis=1))) if base else float("nan")
+        print(f"{backend:<12}{r['load_s']:>8.1f}{r['rows_per_s']:>10.1f}{r['query_ms']:>10.1f}{overlap:>15.3f}{cosine:>12.4f}")
+
+
+if __name__ == "__main__":
+    main()
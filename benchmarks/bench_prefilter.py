@@ -0,0 +1,106 @@
+"""
+Two-stage retrieval report: recall@20 of the BM25 prefilter against encoding the whole pool.
+
+    python -m benchmarks.bench_prefilter --pool 2000 --n 50 100 200 400
+    python -m benchmarks.bench_prefilter --fake-encoder        # no torch needed
+    python -m benchmarks.bench_prefilter --page 0              # whole pool in one batch
+
+Candidates go through core.IncrementalRanker in page-sized batches, like app.run_search,
+so the budget N is spent across batches the way a live search spends it. For every query
+the reference top-20 comes from ContentEngine(prefilter_n=0); each N is scored by how
+much of that top-20 it keeps, how many texts it sent to the encoder and
+how long ranking took with a cold embedding cache. The pool is tmdb_5000_movies.csv when
+present, otherwise synthetic stub movies; it is also the corpus BM25 takes its IDF from
+(the app uses the whole local catalog).
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_search import QUERIES, HashingEncoder
+from benchmarks.tmdb_stub import _fake_movie
+from embedding_cache import EmbeddingCache
+from prefilter import corpus_stats, tokenize
+
+TOP = 20
+PAGE = 20 # candidates per batch, like one TMDB results page
+
+
+def load_pool(size, seed=0):
+    if os.path.exists("tmdb_5000_movies.csv"):
+        import pandas as pd
+        from vector_index import movies_from_frame
+
+        movies = list(movies_from_frame(pd.read_csv("tmdb_5000_movies.csv")).values())
+        random.Random(seed).shuffle(movies)
+        return movies[:size]
+    rng = random.Random(seed)
+    return [_fake_movie(rng, i) for i in range(size)]
+
+
+class CountingEncoder:
+    """Wraps the real encoder and counts the texts it is asked to embed."""
+
+    def __init__(self, encoder):
+        self.encoder = encoder
+        self.cache_name = getattr(encoder, "cache_name", "bench")
+        self.texts = 0
+
+    def encode(self, texts):
+        self.texts += len(texts)
+        return self.encoder.encode(texts)
+
+
+def run(model, pool, n, page=PAGE):
+    """Per query: (top-20 ids, texts encoded, seconds) with a cold embedding cache."""
+    import core
+
+    stats = corpus_stats([tokenize(f"{m['title']} {m['overview']}") for m in pool])
+    out = []
+    for query in QUERIES:
+        counter = CountingEncoder(model)
+        engine = core.ContentEngine(model_loader=lambda name: counter, prefilter_n=n)
+        engine.vector_cache = EmbeddingCache("bench", path=os.path.join(tempfile.mkdtemp(), "prefilter.sqlite"))
+        engine.prefilter_stats = stats
+        engine.encode_query(query) # query encoding is not what we're measuring
+        counter.texts = 0
+        started = time.perf_counter()
+        # The live search path: IncrementalRanker fed TMDB-page-sized batches
+        ranker = core.IncrementalRanker(engine, query, k=TOP)
+        page = page or len(pool)
+        for start in range(0, len(pool), page):
+            ranker.add(pool[start:start + page])
+        ranked = ranker.results()
+        out.append(({m['id'] for m in ranked}, counter.texts, time.perf_counter() - started))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pool", type=int, default=2000, help="candidate pool size")
+    parser.add_argument("--n", type=int, nargs="+", default=[50, 100, 200, 400], help="prefilter budgets to compare")
+    parser.add_argument("--page", type=int, default=PAGE, help="candidates per batch (0 = one batch)")
+    parser.add_argument("--fake-encoder", action="store_true", help="hashing encoder instead of the transformer")
+    args = parser.parse_args()
+
+    import core
+
+    model = HashingEncoder() if args.fake_encoder else core.load_model()
+    pool = load_pool(args.pool)
+
+    full = run(model, pool, 0)
+    print(f"\n{len(pool)} candidates, {len(QUERIES)} queries")
+    print(f"{'N':>8}{'recall@20':>12}{'min':>8}{'encoded':>10}{'rank ms':>10}")
+    print(f"{'all':>8}{1.0:>12.3f}{1.0:>8.2f}{np.mean([r[1] for r in full]):>10.0f}{np.mean([r[2] for r in full]) * 1000:>10.1f}")
+    for n in args.n:
+        rows = run(model, pool, n, args.page)
+        recalls = [len(got & ref) / len(ref) if ref else 1.0 for (got, _, _), (ref, _, _) in zip(rows, full)]
+        print(f"{n:>8}{np.mean(recalls):>12.3f}{min(recalls):>8.2f}{np.mean([r[1] for r in rows]):>10.0f}{np.mean([r[2] for r in rows]) * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+End-to-end search benchmark against the local TMDB stub (never the real API).
+
+Drives fetch_smart_candidates -> _process_results -> ContentEngine.rank_candidates over a
+fixed query set (plus the "Surprise Me" prompts), and reports p50/p95/p99 per stage.
+
+    python -m benchmarks.bench_search --rounds 3 --latency-ms 80 --jitter-ms 40
+    python -m benchmarks.bench_search --sessions 16 --error-rate 0.05   # load test
+    python -m benchmarks.bench_search --fake-encoder                     # no torch needed
+
+The stub replays the recorded TMDB responses in benchmarks/fixtures/ and synthesizes the
+calls nobody recorded; --tmdb synthetic makes every response up (the old behaviour).
+
+--cache cold clears the TMDB response regions before every search and disables the disk
+response cache (network-bound numbers); --cache warm keeps both, which is what repeat
+queries see in production.
+"""
+import argparse
+import hashlib
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.tmdb_stub import MODES, TMDBStub
+from prompts import SURPRISE_PROMPTS
+
+QUERIES = [
+    "Inception",
+    "The Dark Knight",
+    "space exploration with a lonely atmosphere",
+    "time travel romance",
+    "detective noir in a rainy city",
+    "animated movie about toys",
+    "survival on a deserted island",
+    "heist",
+] + SURPRISE_PROMPTS
+
+STAGES = ["fetch", "safe_search", "rank", "total", "trending", "details"]
+
+
+class HashingEncoder:
+    """Cheap deterministic stand-in for SentenceTransformer (bag of hashed words)."""
+
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def encode(self, texts):
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in text.lower().split():
+                out[i, int(hashlib.md5(word.encode()).hexdigest()[:6], 16) % self.dim] += 1.0
+        return out
+
+
+class StageTimer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {stage: [] for stage in STAGES}
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self.samples[stage].append(seconds)
+
+
+def percentile(samples, pct):
+    return float(np.percentile(samples, pct)) * 1000 if samples else float("nan")
+
+
+def report(timer, wall, searches, stub):
+    print(f"\n{'stage':<12}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage in STAGES:
+        s = timer.samples[stage]
+        print(f"{stage:<12}{len(s):>6}{percentile(s, 50):>10.1f}{percentile(s, 95):>10.1f}{percentile(s, 99):>10.1f}")
+    print(f"\n{searches} searches in {wall:.2f}s -> {searches / wall:.1f} searches/s")
+    print(f"stub ({stub.mode}): {stub.requests} requests, {stub.replayed} replayed, {stub.synthesized} synthesized, {stub.errors} injected errors")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=1, help="concurrent simulated users")
+    parser.add_argument("--rounds", type=int, default=1, help="passes over the query set per session")
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--cache", choices=["cold", "warm"], default="cold")
+    parser.add_argument("--tmdb", choices=MODES, default="replay", help="stub responses: recorded (synthetic where missing) or all synthetic")
+    parser.add_argument("--fake-encoder", action="store_true", help="hashing encoder instead of the transformer")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    stub = TMDBStub(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate, seed=args.seed, mode=args.tmdb)
+    # Must be set before utils is imported
+    os.environ["TMDB_API_BASE_URL"] = stub.start()
+    # Disk response cache: off when cold, a private file when warm
+    os.environ["TMDB_CACHE_PATH"] = "" if args.cache == "cold" else os.path.join(tempfile.mkdtemp(), "responses.sqlite")
+
+    import cache
+    import core
+    from embedding_cache import EmbeddingCache
+    from utils import fetch_smart_candidates, fetch_trending, fetch_extended_details, _process_results
+
+    loader = (lambda name: HashingEncoder()) if args.fake_encoder else core.load_model
+    engine = core.ContentEngine(model_loader=loader)
+    # Private embedding store so runs don't read / pollute .cache/
+    engine.vector_cache = EmbeddingCache(core.MODEL_NAME, path=os.path.join(tempfile.mkdtemp(), "bench.sqlite"))
+
+    timer = StageTimer()
+    api_key = "bench"
+
+    def one_search(query):
+        if args.cache == "cold":
+            for r in cache.REGIONS.values(): r.clear()
+        t0 = time.perf_counter()
+        raw = fetch_smart_candidates(api_key, False, query)
+        t1 = time.perf_counter()
+        candidates = _process_results(raw, True)
+        t2 = time.perf_counter()
+        ranked = engine.rank_candidates(candidates, query, k=20)
+        t3 = time.perf_counter()
+        for stage, sec in (("fetch", t1 - t0), ("safe_search", t2 - t1), ("rank", t3 - t2), ("total", t3 - t0)):
+            timer.add(stage, sec)
+        return ranked
+
+    def session(n):
+        rng = random.Random(args.seed + n)
+        for _ in range(args.rounds):
+            queries = QUERIES[:]
+            rng.shuffle(queries)
+            t = time.perf_counter()
+            fetch_trending(api_key)
+            timer.add("trending", time.perf_counter() - t)
+            for q in queries:
+                ranked = one_search(q)
+                if ranked:
+                    t = time.perf_counter()
+                    fetch_extended_details(ranked[0]["id"], api_key)
+                    timer.add("details", time.perf_counter() - t)
+
+    # Warm the model outside the measurement
+    engine.encode_query("warm up")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+        list(pool.map(session, range(args.sessions)))
+    wall = time.perf_counter() - started
+
+    report(timer, wall, len(timer.samples["total"]), stub)
+    stub.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
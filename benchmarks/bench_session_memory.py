@@ -0,0 +1,80 @@
+"""
+Per-session memory of st.session_state.results: ranked TMDB dicts vs compact Cards.
+
+    python -m benchmarks.bench_session_memory --sessions 200 --pool 400
+
+Every simulated session ranks the same stub pool for one of the benchmark queries
+and keeps its results the way app.py used to (ranked dict copies, the whole ranking
+or the top 20) or the way it does now (results.compact). tracemalloc counts only
+what the sessions themselves allocate; the shared "movies" store is reported apart,
+since it is paid once per process no matter how many sessions there are.
+"""
+import argparse
+import gc
+import os
+import random
+import tempfile
+import tracemalloc
+
+from benchmarks.bench_search import QUERIES, HashingEncoder
+from benchmarks.tmdb_stub import _fake_movie
+
+GRID_SIZE = 20
+
+
+def measure(build, sessions):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    held = [build(n) for n in range(sessions)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del held
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--pool", type=int, default=400, help="candidates per search")
+    args = parser.parse_args()
+
+    import core
+    from cache import region
+    from embedding_cache import EmbeddingCache
+    from results import compact
+    from utils import _process_results
+
+    engine = core.ContentEngine(model_loader=lambda name: HashingEncoder())
+    engine.vector_cache = EmbeddingCache("bench", path=os.path.join(tempfile.mkdtemp(), "memory.sqlite"))
+    rng = random.Random(0)
+    pool = _process_results([_fake_movie(rng, i) for i in range(args.pool)], True)
+    rankings = {q: engine.rank_candidates(pool, q) for q in QUERIES} # ranked once, outside the measurement
+
+    def ranked(n):
+        query = QUERIES[n % len(QUERIES)]
+        return query, rankings[query]
+
+    layouts = {
+        "dicts, full ranking": lambda n: [dict(m) for m in ranked(n)[1]],
+        "dicts, top 20": lambda n: [dict(m) for m in ranked(n)[1][:GRID_SIZE]],
+        "compact cards": lambda n: compact(ranked(n)[1], GRID_SIZE),
+    }
+    print(f"\n{args.sessions} sessions, {len(pool)} candidates per search")
+    print(f"{'layout':<22}{'KiB total':>12}{'bytes/session':>16}")
+    for name, build in layouts.items():
+        region("movies").clear()
+        compact_store = name == "compact cards"
+        if compact_store: # fill the shared store first so it isn't billed to the sessions
+            for query in QUERIES: compact(rankings[query], GRID_SIZE)
+        total = measure(build, args.sessions)
+        print(f"{name:<22}{total / 1024:>12.1f}{total / args.sessions:>16.0f}")
+
+    region("movies").clear()
+    shared = measure(lambda n: compact(rankings[QUERIES[n]], GRID_SIZE), len(QUERIES))
+    print(f"\nshared movies store (once per process, {region('movies').stats()['size']} movies): {shared / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Memory and throughput of N app workers: each with its own encoder + index, vs one sidecar.
+
+    python -m benchmarks.bench_sidecar --workers 4 --requests 40
+    python -m benchmarks.bench_sidecar --workers 4 --fake-encoder     # no torch needed
+
+Run it where the app's data lives (tmdb_5000_movies.csv + movie_embeddings/). Every worker
+is its own process, like one Streamlit server: it builds a ContentEngine, then all workers
+run --requests rounds together of what a search asks from the model (local recall for a
+fresh query plus one batch of candidate texts). Reported per mode: start-up time, peak RSS
+of the workers and of the sidecar, and requests/s for the whole host. Peak RSS counts
+mapped store pages in every process that touched them.
+"""
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_search import QUERIES, HashingEncoder
+
+BATCH = 32 # candidate texts per request
+
+
+def fake_encoder():
+    encoder = HashingEncoder()
+    encoder.cache_name = "bench-hashing"
+    return encoder
+
+
+def make_model(fake, sidecar):
+    import core
+    from encode_queue import batched
+    from sidecar import RemoteEncoder, connect
+
+    if not fake: return core.load_model(sidecar=sidecar)
+    local = lambda: batched(fake_encoder())
+    client = connect(sidecar)
+    return RemoteEncoder(client, local) if client else local()
+
+
+def serve(path, fake):
+    """Sidecar entry point for the benchmark (same as sidecar.py, plus --fake-encoder)."""
+    import core
+    import sidecar
+    from encode_queue import batched
+
+    movies_df, embeddings = core.load_data()
+    encoder = batched(fake_encoder()) if fake else core.load_model(sidecar=None)
+    sidecar.serve(path, encoder, core.local_index(embeddings, movies_df))
+
+
+def worker(n, args, sidecar, barrier, results):
+    started = time.perf_counter()
+    import core
+    from sidecar import peak_rss_mb
+
+    movies_df, embeddings = core.load_data()
+    model = make_model(args.fake_encoder, sidecar)
+    engine = core.ContentEngine(embeddings=embeddings, movies_df=movies_df, model_loader=lambda name: model, sidecar=sidecar)
+    engine.search_local("warm up") # the first call pays for lazy loads
+    ready = time.perf_counter() - started
+
+    texts = [core.compose_text(m) for m in engine.local_movies.values()]
+    barrier.wait()
+    begin = time.perf_counter()
+    for i in range(args.requests):
+        engine.search_local(f"{QUERIES[i % len(QUERIES)]} ({n}/{i})") # fresh query: no query-cache hit
+        offset = (n * args.requests + i) * BATCH % max(len(texts) - BATCH, 1)
+        engine.model.encode(texts[offset:offset + BATCH])
+    results.put({
+        "ready": ready, "seconds": time.perf_counter() - begin,
+        "rss_mb": peak_rss_mb(), "remote": engine.index.kind == "sidecar",
+    })
+
+
+def run(args, sidecar):
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(args.workers)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(n, args, sidecar, barrier, results)) for n in range(args.workers)]
+    for p in procs: p.start()
+    out = [results.get() for _ in procs]
+    for p in procs: p.join()
+    if sidecar and not all(r["remote"] for r in out):
+        print("⚠️ Some workers fell back to in-process search.")
+    return out
+
+
+def start_sidecar(path, fake, timeout=300):
+    from sidecar import SidecarClient, SidecarUnavailable
+
+    cmd = [sys.executable, "-m", "benchmarks.bench_sidecar", "--serve", path] + (["--fake-encoder"] if fake else [])
+    proc = subprocess.Popen(cmd)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None: raise SystemExit("🚨 Sidecar exited during start-up")
+        if os.path.exists(path):
+            client = SidecarClient(path, timeout=timeout)
+            try:
+                client.call("ping")
+                return proc, client
+            except SidecarUnavailable:
+                pass
+        time.sleep(0.2)
+    proc.kill()
+    raise SystemExit("🚨 Sidecar did not come up")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=40, help="rounds per worker")
+    parser.add_argument("--fake-encoder", action="store_true", help="hashing encoder instead of the transformer")
+    parser.add_argument("--serve", metavar="SOCKET", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        return serve(args.serve, args.fake_encoder)
+
+    rows = []
+    local = run(args, None)
+    rows.append(("in-process", local, 0.0))
+
+    path = os.path.join(tempfile.mkdtemp(), "sidecar.sock")
+    proc, client = start_sidecar(path, args.fake_encoder)
+    try:
+        remote = run(args, path)
+        rows.append(("sidecar", remote, client.call("info")[0]["rss_mb"]))
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    total = args.workers * args.requests
+    print(f"\n{args.workers} workers x {args.requests} requests (query + {BATCH} candidate texts each)")
+    print(f"{'mode':<12}{'ready s':>9}{'worker MB':>11}{'sidecar MB':>12}{'host MB':>9}{'req/s':>9}")
+    for mode, out, sidecar_mb in rows:
+        ready = sum(r["ready"] for r in out) / len(out)
+        workers_mb = sum(r["rss_mb"] for r in out)
+        rate = total / max(r["seconds"] for r in out)
+        print(f"{mode:<12}{ready:>9.2f}{workers_mb:>11.0f}{sidecar_mb:>12.0f}{workers_mb + sidecar_mb:>9.0f}{rate:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+Local TMDB stand-in for benchmarks.
+
+Replays recorded responses (benchmarks/fixtures/tmdb_recorded.jsonl) for the endpoints
+Lumina uses, and synthesizes deterministic ones for anything not recorded (mode="replay",
+the default); mode="synthetic" ignores the recordings. Latency and error rates are
+injectable, so runs are repeatable and never touch the real API.
+
+The committed fixture is small: trending, two Deep History pages, and the search /
+keyword / discover / details calls for a few benchmark queries. It was assembled in the
+API's response format from public TMDB catalog entries (popularity and vote numbers are
+approximate). `record` replaces it with live responses; the api_key never reaches the file.
+
+    python -m benchmarks.tmdb_stub serve --port 8765 --latency-ms 80 --jitter-ms 40 --error-rate 0.02
+    python -m benchmarks.tmdb_stub record --api-key $TMDB_API_KEY   # refresh the recordings
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+FIXTURES_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "tmdb_recorded.jsonl")
+REAL_TMDB = "https://api.themoviedb.org/3"
+MODES = ("replay", "synthetic")
+
+_WORDS = (
+    "night city ocean space dream road winter ghost heist robot king river machine garden "
+    "silent storm empire shadow summer island signal mirror orbit harbor frontier echo"
+).split()
+
+
+def fixture_key(path, params):
+    """Endpoint + normalized params, api_key excluded."""
+    clean = sorted((k, str(v)) for k, v in params.items() if k != "api_key")
+    return path + "?" + "&".join(f"{k}={v}" for k, v in clean)
+
+
+def load_fixtures(path=FIXTURES_PATH):
+    fixtures = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    rec = json.loads(line)
+                    fixtures[fixture_key(rec["path"], rec["params"])] = rec["body"]
+    return fixtures
+
+
+def _seeded(key):
+    return random.Random(int(hashlib.sha1(key.encode()).hexdigest()[:8], 16))
+
+
+def _fake_movie(rng, movie_id):
+    title = " ".join(rng.choice(_WORDS).title() for _ in range(rng.randint(1, 3)))
+    overview = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(20, 60))).capitalize() + "."
+    return {
+        "id": movie_id,
+        "title": title,
+        "overview": overview,
+        "release_date": f"{rng.randint(1960, 2024)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "popularity": round(rng.uniform(1, 500), 3),
+        "vote_average": round(rng.uniform(4, 9), 1),
+        "vote_count": rng.randint(10, 30000),
+        "genre_ids": rng.sample([12, 14, 16, 18, 27, 28, 35, 53, 80, 878, 9648, 10749], 2),
+        "adult": False,
+        "poster_path": f"/p{movie_id}.jpg",
+        "backdrop_path": f"/b{movie_id}.jpg",
+    }
+
+
+def synthesize(path, params):
+    """Deterministic TMDB-shaped body for any request we have no recording for."""
+    key = fixture_key(path, params)
+    rng = _seeded(key)
+    if path == "/search/keyword":
+        return {"page": 1, "results": [{"id": rng.randint(1, 300000), "name": params.get("query", "")} for _ in range(rng.randint(0, 4))]}
+    movie = re.fullmatch(r"/movie/(\d+)", path)
+    if movie:
+        movie_id = int(movie.group(1))
+        body = _fake_movie(rng, movie_id)
+        body.update({
+            "runtime": rng.randint(80, 180),
+            "tagline": "",
+            "imdb_id": f"tt{movie_id:07d}",
+            "credits": {
+                "cast": [{"name": f"Actor {rng.randint(1, 9999)}"} for _ in range(12)],
+                "crew": [{"name": f"Director {rng.randint(1, 999)}", "job": "Director"}],
+            },
+            "release_dates": {"results": [{"iso_3166_1": "US", "release_dates": [{"certification": rng.choice(["PG", "PG-13", "R"])}]}]},
+        })
+        return body
+    # List endpoints: /search/movie, /discover/movie, /trending/movie/day
+    base = rng.randint(1, 50) * 10000
+    return {"page": int(params.get("page", 1)), "results": [_fake_movie(rng, base + i) for i in range(20)]}
+
+
+class TMDBStub:
+    """
+    Threaded stub server. start() returns the base URL to put in TMDB_API_BASE_URL.
+    latency_ms / jitter_ms delay every response; error_rate answers that share with 500 or 429.
+    replayed / synthesized count the 200s served from the recordings vs made up.
+    """
+
+    def __init__(self, fixtures_path=FIXTURES_PATH, latency_ms=0, jitter_ms=0, error_rate=0.0, seed=0, port=0, mode="replay"):
+        if mode not in MODES: raise ValueError(f"mode must be one of {MODES}, got {mode}")
+        self.mode = mode
+        self.fixtures = load_fixtures(fixtures_path) if mode == "replay" else {}
+        if mode == "replay" and not self.fixtures:
+            print(f"⚠️ No TMDB recordings at {fixtures_path}, every response will be synthetic.")
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.port = port
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._server = None
+        self.requests = 0
+        self.errors = 0
+        self.replayed = 0
+        self.synthesized = 0
+
+    def _draw(self):
+        with self._rng_lock:
+            self.requests += 1
+            delay = max(0.0, self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            fail = self._rng.random() < self.error_rate
+            if fail: self.errors += 1
+            return delay, fail, self._rng.choice([429, 500])
+
+    def respond(self, path, params):
+        """(status, headers, body) for one request."""
+        delay, fail, status = self._draw()
+        time.sleep(delay)
+        if fail:
+            return status, {"Retry-After": "1"} if status == 429 else {}, {"status_message": "injected failure"}
+        body = self.fixtures.get(fixture_key(path, params))
+        with self._rng_lock:
+            if body is None: self.synthesized += 1
+            else: self.replayed += 1
+        if body is None: body = synthesize(path, params)
+        return 200, {}, body
+
+    def start(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" # keep-alive, like the real API
+            disable_nagle_algorithm = True # headers + body are separate writes
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                path = url.path[2:] if url.path.startswith("/3/") else url.path
+                status, headers, body = stub.respond(path, dict(parse_qsl(url.query)))
+                payload = json.dumps(body).encode()
+                if status == 200:
+                    # Conditional requests, like the real API's CDN
+                    etag = '"' + hashlib.sha1(payload).hexdigest()[:16] + '"'
+                    headers["ETag"] = etag
+                    if self.headers.get("If-None-Match") == etag:
+                        status, payload = 304, b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="tmdb-stub", daemon=True).start()
+        return f"http://127.0.0.1:{self._server.server_address[1]}/3"
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+def record(api_key, queries, path=FIXTURES_PATH, details=3):
+    """
+    Capture real TMDB responses for the benchmark query set: the calls Lumina makes
+    (keyword discover pages and the top hits' details included). api_key is scrubbed.
+    """
+    import requests
+
+    if not api_key: raise SystemExit("🚨 record needs --api-key (or TMDB_API_KEY)")
+    session = requests.Session()
+    records = []
+
+    def get(endpoint, params):
+        resp = session.get(REAL_TMDB + endpoint, params={**params, "api_key": api_key}, timeout=10)
+        if resp.status_code != 200: return None
+        body = resp.json()
+        records.append(json.dumps({"path": endpoint, "params": params, "body": body}).replace(api_key, "<scrubbed>"))
+        return body
+
+    get("/trending/movie/day", {"language": "en-US", "include_adult": "false"})
+    for p in range(1, 6):
+        get("/discover/movie", {"language": "en-US", "sort_by": "vote_count.desc", "vote_count.gte": "1000", "include_adult": "false", "page": p})
+    for q in queries:
+        found = get("/search/movie", {"query": q, "include_adult": "false", "region": "US", "page": 1}) or {}
+        keyword_ids = []
+        for w in [w for w in q.lower().split() if len(w) > 3]:
+            keyword_ids += [str(k["id"]) for k in (get("/search/keyword", {"query": w}) or {}).get("results", [])[:2]]
+        if keyword_ids:
+            for p in range(1, 4):
+                get("/discover/movie", {"with_keywords": "|".join(keyword_ids[:10]), "language": "en-US", "sort_by": "popularity.desc", "include_adult": "false", "page": p})
+        for movie in found.get("results", [])[:details]:
+            get(f"/movie/{movie['id']}", {"append_to_response": "credits"})
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(records) + "\n")
+    print(f"Recorded {len(records)} calls -> {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    serve = sub.add_parser("serve")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--latency-ms", type=float, default=0)
+    serve.add_argument("--jitter-ms", type=float, default=0)
+    serve.add_argument("--error-rate", type=float, default=0.0)
+    serve.add_argument("--mode", choices=MODES, default="replay", help="replay the recordings (synthesizing the rest) or synthesize everything")
+    rec = sub.add_parser("record")
+    rec.add_argument("--api-key", default=os.getenv("TMDB_API_KEY"))
+    args = parser.parse_args()
+
+    if args.cmd == "record":
+        from benchmarks.bench_search import QUERIES
+        record(args.api_key, QUERIES)
+        return
+
+    stub = TMDBStub(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate, port=args.port, mode=args.mode)
+    print(f"TMDB stub on {stub.start()} (Ctrl+C to stop)")
+    try:
+        while True: time.sleep(3600)
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import register_collector
+
+
+class CacheRegion:
+    """
+    One named cache region: TTL + size-bounded LRU, thread-safe.
+    Regions are independent, so clearing / evicting one never touches another.
+    """
+
+    def __init__(self, name, ttl, maxsize):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict() # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None: del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_set(self, key, loader):
+        """Return the cached value or call loader(); None results are not cached."""
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            if value is not None: self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def keys(self):
+        """Snapshot of the live (unexpired) keys; doesn't count as hits / misses."""
+        now = time.monotonic()
+        with self._lock:
+            return [key for key, (expires_at, _) in self._data.items() if expires_at >= now]
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._data), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+# REGIONS: raw (unfiltered) TMDB data. Safe Search is applied after the cache.
+REGIONS = {
+    "trending": CacheRegion("trending", ttl=3600, maxsize=4),
+    "search": CacheRegion("search", ttl=3600, maxsize=1024), # direct /search/movie
+    "keywords": CacheRegion("keywords", ttl=24 * 3600, maxsize=4096), # word -> keyword ids
+    "discover": CacheRegion("discover", ttl=3600, maxsize=1024), # keyword discover pages
+    "classics": CacheRegion("classics", ttl=6 * 3600, maxsize=16), # Deep History pages
+    "details": CacheRegion("details", ttl=24 * 3600, maxsize=2000), # /movie/{id}
+    "movies": CacheRegion("movies", ttl=6 * 3600, maxsize=5000), # full payload behind each result card
+    # Derived: ranked top-k per (query, Safe Search), see query_cache.py. Same TTL as the pages it's built from
+    "results": CacheRegion("results", ttl=3600, maxsize=256),
+}
+
+
+def region(name):
+    return REGIONS[name]
+
+
+def cache_stats():
+    return {name: r.stats() for name, r in REGIONS.items()}
+
+
+def _collect():
+    for name, stats in cache_stats().items():
+        for field, value in stats.items():
+            yield f"cache_{field}", {"region": name}, value
+
+register_collector(_collect)
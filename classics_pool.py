@@ -0,0 +1,84 @@
+import threading
+import time
+
+from utils import (
+    TMDB_API_BASE_URL, CLASSICS_PAGES, _FANOUT_POOL,
+    classics_params, get_session, _get_results, _process_results,
+)
+
+# Deep History barely moves, a few refreshes a day is plenty
+REFRESH_INTERVAL = 6 * 3600
+
+
+class PoolSnapshot:
+    """Immutable view of the pool: processed movies + their vectors, by id."""
+    __slots__ = ("movies", "vectors", "fetched_at")
+
+    def __init__(self, movies, vectors, fetched_at):
+        self.movies = movies
+        self.vectors = vectors
+        self.fetched_at = fetched_at
+
+
+class ClassicsPool:
+    """
+    Background "Deep History" pool.
+    1. Fetches the vote_count.desc discover pages on a timer.
+    2. Runs them through _process_results (Safe Search off -> callers filter per query).
+    3. Pre-encodes them with the ContentEngine model.
+    4. Swaps the new snapshot in with a single assignment, so readers never see a half-built pool.
+    """
+
+    def __init__(self, api_key, engine, interval=REFRESH_INTERVAL):
+        self.api_key = api_key
+        self.engine = engine
+        self.interval = interval
+        self._snapshot = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="classics-pool", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def snapshot(self):
+        """Current pool, or None until the first refresh lands."""
+        return self._snapshot
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"⚠️ Classics pool refresh failed: {e}")
+            # Retry sooner while we have nothing to serve
+            self._stop.wait(self.interval if self._snapshot else 60)
+
+    def refresh(self):
+        session = get_session()
+        url = f"{TMDB_API_BASE_URL}/discover/movie"
+        futures = [_FANOUT_POOL.submit(_get_results, session, url, classics_params(self.api_key, p)) for p in CLASSICS_PAGES]
+        pages = [f.result() for f in futures]
+        if all(page is None for page in pages):
+            print("⚠️ Classics pool: TMDB unreachable, keeping previous pool.")
+            return
+
+        movies = {}
+        for page in pages:
+            for m in page or []:
+                if m['id'] not in movies:
+                    movies[m['id']] = m
+        processed = _process_results(list(movies.values()), safe_search=False)
+        vectors = self.engine.encode_candidates(processed)
+
+        self._snapshot = PoolSnapshot(
+            movies=processed,
+            vectors={m['id']: vectors[i] for i, m in enumerate(processed)},
+            fetched_at=time.time(),
+        )
+        print(f"✅ Classics pool refreshed: {len(processed)} movies pre-encoded.")
@@ -0,0 +1,430 @@
+"""
+Lumina core: the ranking pipeline without any Streamlit dependency.
+Importable from workers, batch jobs and HTTP services; app.py warms it up for the UI.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from embedding_cache import EmbeddingCache
+from embedding_store import DEFAULT_STORE_DIR, EmbeddingStore
+from metrics import incr, observe, register_collector, span
+from prefilter import PREFILTER_N, corpus_stats, prefilter, tokenize
+from sidecar import SIDECAR_SOCKET, RemoteEncoder, RemoteIndex, SidecarUnavailable, connect
+from vector_index import build_index, embedding_matrix, movies_from_frame
+
+MODEL_NAME = 'sentence-transformers/all-MiniLM-L6-v2'
+CSV_PATH = "tmdb_5000_movies.csv"
+EMBEDDINGS_PATH = "movie_embeddings.pkl"
+STORE_PATH = DEFAULT_STORE_DIR
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+class DataFileMissing(FileNotFoundError):
+    """A required data asset is missing; `hint` tells the operator how to fix it."""
+
+    def __init__(self, path, hint):
+        super().__init__(f"'{path}' not found!")
+        self.path = path
+        self.hint = hint
+
+
+def load_model(name=MODEL_NAME, backend=None, sidecar=SIDECAR_SOCKET):
+    """
+    Default model hook: one encoder per process, per (name, backend).
+    The backend (torch / torch-int8 / onnx) defaults to LUMINA_ENCODER, see encoders.py.
+    Calls from every session go through one micro-batching queue (encode_queue.py).
+    If the sidecar socket (LUMINA_SIDECAR) answers, the model lives there instead and this
+    process only loads its own copy if the sidecar goes away (sidecar.py).
+    """
+    from encode_queue import batched
+    from encoders import make_encoder
+
+    key = (name, backend or os.getenv("LUMINA_ENCODER"), sidecar)
+    with _models_lock:
+        if key not in _models:
+            local = lambda: batched(make_encoder(name, backend))
+            client = connect(sidecar)
+            try:
+                _models[key] = RemoteEncoder(client, local) if client else local()
+            except SidecarUnavailable: # went away right after the ping
+                _models[key] = local()
+        return _models[key]
+
+
+def load_data(csv_path=CSV_PATH, embeddings_path=EMBEDDINGS_PATH, store_path=STORE_PATH):
+    """
+    Data loader for precomputed assets.
+    1. Loads 'tmdb_5000_movies.csv' as a DataFrame.
+    2. Opens the mmap embedding store ('movie_embeddings/') if present,
+       else falls back to unpickling 'movie_embeddings.pkl'.
+    Raises DataFileMissing instead of talking to a UI.
+    """
+    import pandas as pd
+    import pickle
+
+    # 1. CSV CHECK
+    if not os.path.exists(csv_path):
+        raise DataFileMissing(csv_path, "Please download the dataset from Kaggle and place it in the project root.")
+
+    df = pd.read_csv(csv_path)
+
+    # 2. PRECOMPUTED EMBEDDINGS CHECK
+    if os.path.exists(os.path.join(store_path, "header.json")):
+        store = EmbeddingStore(store_path)
+        if store.model_name != MODEL_NAME:
+            print(f"⚠️ Embedding store was built with {store.model_name}, engine uses {MODEL_NAME}.")
+        print(f"✅ Mapped {len(store)} embeddings from {store_path}/ ({store.header['dtype']}).")
+        return df, store
+
+    if not os.path.exists(embeddings_path):
+        raise DataFileMissing(embeddings_path, f"Run 'python generate_embeddings.py' to build {store_path}/ before starting the app.")
+
+    print(f"✅ Loading embeddings from {embeddings_path}... (run 'python embedding_store.py convert' for a faster, shared mmap store)")
+    with open(embeddings_path, "rb") as f:
+        embeddings = pickle.load(f)
+
+    return df, embeddings
+
+
+def local_index(embeddings, movies_df=None):
+    """Index over the precomputed matrix: the mmap store as is, else a private float copy."""
+    if isinstance(embeddings, EmbeddingStore):
+        return embeddings # searched in place
+    if embeddings is not None and movies_df is not None:
+        ids, matrix = embedding_matrix(embeddings, movies_df)
+        return build_index(matrix, ids)
+    return None
+
+
+def compose_text(movie):
+    """The text that gets embedded for a candidate (keep in sync with the cache key)."""
+    return f"Movie Title: {movie.get('title', '')}. Year: {movie.get('release_date', '')[:4]}. Plot Summary: {movie.get('overview', '')}"
+
+
+def _normalize_rows(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k(scores, k=None):
+    """
+    Indices + scores of the k best finite scores, best first (k=None -> all of them).
+    argpartition keeps this O(n) for big pools; only the k winners get sorted.
+    """
+    valid = np.flatnonzero(np.isfinite(scores))
+    if k is not None and k < len(valid):
+        valid = valid[np.argpartition(-scores[valid], k - 1)[:k]]
+        valid.sort() # keep pool order for ties, like the old stable sort
+    order = np.argsort(-scores[valid], kind="stable")
+    return valid[order], scores[valid][order]
+
+
+class ContentEngine:
+    def __init__(self, embeddings=None, movies_df=None, model_loader=load_model, prefilter_n=PREFILTER_N, sidecar=SIDECAR_SOCKET):
+        self.embeddings = embeddings
+        self.prefilter_n = prefilter_n # stage-1 budget (0 = encode the whole pool)
+        self.prefilter_stats = None # BM25 corpus stats, from the local catalog on first use
+        self.model = model_loader(MODEL_NAME)
+        # Cached vectors are per backend: quantized models drift slightly from float ones
+        self.vector_cache = EmbeddingCache(getattr(self.model, "cache_name", None) or MODEL_NAME)
+        self._query_cache = OrderedDict()
+        self._query_lock = threading.Lock()
+        register_collector(self._collect)
+
+        # LOCAL RETRIEVAL: index over the precomputed tmdb_5000 matrix
+        # (on the sidecar if there is one; the local index is then only built as its fallback)
+        self.local_movies = {}
+        client = connect(sidecar) if embeddings is not None and movies_df is not None else None
+        self.index = None
+        if client is not None:
+            try: self.index = RemoteIndex(client, lambda: local_index(embeddings, movies_df))
+            except SidecarUnavailable: pass
+        if self.index is None:
+            self.index = local_index(embeddings, movies_df)
+        if self.index is not None and movies_df is not None:
+            self.local_movies = movies_from_frame(movies_df)
+
+    def _collect(self):
+        for field, value in self.vector_cache.stats().items():
+            yield f"embedding_cache_{field}", {}, value
+
+    def encode_queries(self, queries):
+        """
+        (n_queries, dim) matrix. Unseen queries are encoded together in one batch;
+        vectors are reused between local recall and re-ranking.
+        """
+        with self._query_lock:
+            cached = {q: self._query_cache.get(q) for q in queries}
+        missing = list(dict.fromkeys(q for q, v in cached.items() if v is None))
+        if missing:
+            with span("encode_query"):
+                vecs = np.asarray(self.model.encode(missing), dtype=np.float32)
+            with self._query_lock:
+                for q, v in zip(missing, vecs):
+                    cached[q] = v
+                    self._query_cache[q] = v
+                while len(self._query_cache) > 256:
+                    self._query_cache.popitem(last=False)
+        return np.vstack([cached[q] for q in queries])
+
+    def encode_query(self, query):
+        return self.encode_queries([query])
+
+    def search_local(self, query, k=50):
+        """
+        Local Recall: top-k tmdb_5000 movies for the query, no network involved.
+        Returns raw movie dicts (run them through the safe-search filter before display).
+        """
+        if self.index is None or not query or not query.strip(): return []
+        rows, _ = self.index.search(self.encode_query(query), k)
+        hits = []
+        for row in rows[0]:
+            movie = self.local_movies.get(int(self.index.ids[row]))
+            if movie: hits.append(dict(movie))
+        return hits
+
+    def similar(self, movie, k=20):
+        """
+        "More like this": the k tmdb_5000 movies closest to `movie`, from stored vectors only.
+        1. Catalog movie + a neighbour table in the store -> a row lookup.
+        2. Catalog movie without one -> one matvec over the matrix.
+        3. TMDB-only movie -> its cached vector (ranking already encoded it), else nothing.
+        Never calls the model. Returns raw movie dicts with 'match_score' (filter before display).
+        """
+        if self.index is None: return []
+        row = self.index.row_of(movie['id'])
+        table = self.index.neighbours
+        if row is not None and table is not None and table.shape[1] >= k:
+            source = "table"
+            rows = np.asarray(table[row][:k], dtype=np.int64)
+            scores = self.index.dense(rows) @ self.index.dense([row])[0]
+        else:
+            if row is not None:
+                source, vec = "matmul", self.index.dense([row])
+            elif movie.get('title'):
+                source, vec = "cache", self.vector_cache.get(movie['id'], compose_text(movie))
+            else:
+                vec = None
+            if vec is None:
+                incr("similar_lookups", source="miss")
+                return []
+            with span("similar_search"):
+                found, found_scores = self.index.search(vec, k + 1)
+            keep = found[0] != row if row is not None else slice(None)
+            rows, scores = found[0][keep][:k], found_scores[0][keep][:k]
+        incr("similar_lookups", source=source)
+
+        hits = []
+        for r, score in zip(rows, scores):
+            match = self.local_movies.get(int(self.index.ids[r]))
+            if match and match['id'] != movie['id']: hits.append({**match, 'match_score': float(score)})
+        return hits
+
+    def encode_candidates(self, candidates, known_vectors=None, texts=None):
+        """
+        Candidate matrix, one row per movie.
+        known_vectors ({id: vec}, e.g. the classics pool) skip the cache and the model entirely.
+        texts: compose_text of every candidate, if the caller already has them.
+        """
+        known_vectors = known_vectors or {}
+        todo = [i for i, m in enumerate(candidates) if m['id'] not in known_vectors]
+        fresh = None
+        if todo:
+            if texts is None:
+                with span("compose_text"):
+                    texts = [compose_text(candidates[i]) for i in todo]
+            else:
+                texts = [texts[i] for i in todo]
+            with span("encode_candidates"):
+                fresh = self.vector_cache.encode([candidates[i]['id'] for i in todo], texts, self.model.encode)
+            if len(todo) == len(candidates): return fresh
+
+        rows = [known_vectors.get(m['id']) for m in candidates]
+        for j, i in enumerate(todo):
+            rows[i] = fresh[j]
+        return np.vstack(rows).astype(np.float32, copy=False)
+
+    def _similarities(self, queries, candidate_vecs):
+        """Cosine similarity, (n_queries, n_candidates), as one matmul."""
+        query_vecs = self.encode_queries(queries)
+        with span("cosine_similarity"):
+            return _normalize_rows(query_vecs) @ _normalize_rows(candidate_vecs).T
+
+    @staticmethod
+    def _boost(similarity, titles, query):
+        """
+        Total System Recode: Title Boosting & Lower Threshold, as array ops.
+        Returns one score per candidate; anything under the threshold is -inf.
+        """
+        scores = similarity.astype(np.float32)
+        query_lower = query.lower().strip()
+
+        # TITLE BOOSTING (+0.10)
+        # If any significant word from query is in title
+        long_words = [w for w in set(query_lower.split()) if len(w) > 3]
+        if long_words:
+            boosted = np.zeros(len(titles), dtype=bool)
+            for w in long_words:
+                boosted |= np.char.find(titles, w) >= 0
+            scores += np.float32(0.10) * boosted
+
+        # Exact Match Super Boost
+        scores[titles == query_lower] = 2.0
+
+        # 4. LOWER THRESHOLD (0.22)
+        # Allow slightly looser semantic matches since we have a title boost for relevance
+        scores[scores < 0.22] = -np.inf
+        return scores
+
+    def _stage_one(self, candidates, query, known_vectors=None, budget=None):
+        """
+        STAGE 1: which candidates reach the transformer -> (kept indices, texts, paid).
+        Free candidates (known vectors, or in the embedding cache's memory tier) always pass;
+        of the rest, BM25 keeps the best `budget` (default prefilter_n). paid = kept and not free.
+        Texts are composed once here and handed on to the encoder.
+        """
+        with span("compose_text"):
+            texts = [compose_text(m) for m in candidates]
+        if not self.prefilter_n or not query or not query.strip():
+            return list(range(len(candidates))), texts, None
+        budget = self.prefilter_n if budget is None else max(budget, 0)
+        with span("prefilter"):
+            if self.prefilter_stats is None and self.local_movies:
+                self.prefilter_stats = corpus_stats([tokenize(f"{m['title']} {m['overview']}") for m in self.local_movies.values()])
+            free = set(known_vectors or ())
+            free |= self.vector_cache.in_memory([m['id'] for m in candidates], texts)
+            keep = prefilter(candidates, query, budget, free, self.prefilter_stats)
+        return keep, texts, sum(1 for i in keep if candidates[i]['id'] not in free)
+
+    def _score(self, candidates, query, known_vectors=None, budget=None):
+        """(scores, paid): score_candidates plus how many vectors stage 1 let through uncached."""
+        observe("pool_size", len(candidates))
+        keep, texts, paid = self._stage_one(candidates, query, known_vectors, budget)
+        scores = np.full(len(candidates), -np.inf, dtype=np.float32)
+        observe("encoded_pool_size", len(keep))
+        if not keep: return scores, 0
+        kept = [candidates[i] for i in keep] if len(keep) < len(candidates) else candidates
+        # 1-2. PREPARE TEXTS (Richer Context) + ENCODE
+        # Cached: only unseen / changed movies hit the model
+        candidate_vecs = self.encode_candidates(kept, known_vectors, [texts[i] for i in keep])
+        # 3. COSINE SIMILARITY
+        similarity = self._similarities([query], candidate_vecs)[0]
+        with span("boost"):
+            titles = np.array([movie['title'].lower() for movie in kept])
+            scores[keep] = self._boost(similarity, titles, query)
+        return scores, (len(keep) if paid is None else paid)
+
+    def score_candidates(self, candidates, query, known_vectors=None, budget=None):
+        """
+        One score per candidate (-inf = below threshold, or dropped by the stage-1 prefilter).
+        Shared by rank_candidates and IncrementalRanker, so live searches are prefiltered too.
+        """
+        return self._score(candidates, query, known_vectors, budget)[0]
+
+    def rank_candidates(self, candidates, query, known_vectors=None, k=None):
+        """
+        Ranked copies of the top-k candidates, each with 'match_score'.
+        Input dicts are never mutated (they may live in a shared cache).
+        """
+        if not candidates: return []
+
+        # Baseline: Popularity
+        if not query or query.strip() == "":
+            ranked = sorted(candidates, key=lambda x: x.get('popularity', 0), reverse=True)
+            return ranked[:k] if k else ranked
+
+        # STAGE 1 (lexical prefilter) + STAGE 2 (transformer) -> only the top N get encoded
+        scores = self.score_candidates(candidates, query, known_vectors)
+        with span("top_k"):
+            idx, top_scores = top_k(scores, k)
+        return [{**candidates[i], 'match_score': float(sc)} for i, sc in zip(idx, top_scores)]
+
+    def rank_many(self, queries, candidates, known_vectors=None, k=None):
+        """
+        Batch API for offline evaluation / precomputation.
+        All queries are encoded in one batch and scored against one shared candidate
+        matrix with a single matmul. Returns one ranked list per query (same shape as
+        rank_candidates); empty queries fall back to the popularity baseline.
+        No stage-1 prefilter here: every candidate is encoded (the reference ranking).
+        """
+        if not candidates: return [[] for _ in queries]
+        real = [q for q in queries if q and q.strip()]
+        ranked = {}
+        if real:
+            candidate_vecs = self.encode_candidates(candidates, known_vectors)
+            similarity = self._similarities(real, candidate_vecs)
+            titles = np.array([movie['title'].lower() for movie in candidates])
+            for row, query in enumerate(real):
+                idx, top_scores = top_k(self._boost(similarity[row], titles, query), k)
+                ranked[query] = [{**candidates[i], 'match_score': float(sc)} for i, sc in zip(idx, top_scores)]
+        return [ranked[q] if q in ranked else self.rank_candidates(candidates, q, k=k) for q in queries]
+
+
+class IncrementalRanker:
+    """
+    Running top-k for a search whose candidates arrive in batches (utils.stream_smart_candidates).
+    add() encodes and scores only ids it has not seen yet, then merges them with the current
+    top-k, so each refinement costs one small batch instead of the whole pool.
+    The stage-1 prefilter budget (engine.prefilter_n uncached encodes, off by default) is
+    shared by the whole search: sources added first (direct search) spend it first.
+    First copy of an id wins, so add the sources in priority order; stand-in copies
+    (add(..., stand_in=True), e.g. local catalog rows without posters) give way to a later real one.
+    """
+
+    def __init__(self, engine, query, k=None, known_vectors=None):
+        self.engine = engine
+        self.query = query
+        self.k = k
+        self.known_vectors = known_vectors
+        self.budget = engine.prefilter_n or None # uncached encodes left (None = unlimited)
+        self.seen = set()
+        self._stand_ins = set() # ids whose payload is a local stand-in so far
+        self._movies = []
+        self._scores = np.empty(0, dtype=np.float32)
+
+    def add(self, batch, stand_in=False):
+        """
+        Merge one batch of candidates; returns the refreshed ranking.
+        stand_in=True (local CSV rows: no posters): a later copy of the same id from a real
+        source replaces the payload, keeping the score already computed.
+        """
+        fresh = []
+        for movie in batch:
+            movie_id = movie['id']
+            if movie_id in self.seen:
+                if not stand_in and movie_id in self._stand_ins:
+                    self._stand_ins.discard(movie_id)
+                    for i, held in enumerate(self._movies):
+                        if held['id'] == movie_id:
+                            self._movies[i] = movie
+                continue
+            self.seen.add(movie_id)
+            if stand_in: self._stand_ins.add(movie_id)
+            fresh.append(movie)
+        if not fresh: return self.results()
+
+        if self.query and self.query.strip():
+            scores, paid = self.engine._score(fresh, self.query, self.known_vectors, self.budget)
+            if self.budget is not None: self.budget = max(self.budget - paid, 0)
+        else:
+            # Baseline: Popularity
+            scores = np.array([m.get('popularity', 0) for m in fresh], dtype=np.float32)
+
+        with span("top_k"):
+            movies = self._movies + fresh
+            idx, top_scores = top_k(np.concatenate([self._scores, scores]), self.k)
+        self._movies = [movies[i] for i in idx]
+        self._scores = top_scores
+        return self.results()
+
+    def results(self):
+        """Ranked copies, same shape as ContentEngine.rank_candidates."""
+        if not (self.query and self.query.strip()): return [dict(m) for m in self._movies]
+        return [{**m, 'match_score': float(sc)} for m, sc in zip(self._movies, self._scores)]
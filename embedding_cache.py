@@ -0,0 +1,183 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from metrics import incr
+
+# Constants
+DEFAULT_CACHE_PATH = os.path.join(".cache", "candidate_embeddings.sqlite")
+DEFAULT_MEMORY_ITEMS = 5000
+# Disk rows kept across all models (~1.5 KB each at 384 dims); the oldest writes go first
+DEFAULT_DISK_ROWS = int(os.getenv("LUMINA_EMBEDDING_CACHE_ROWS", 200_000))
+BUSY_TIMEOUT = 5 # seconds a statement waits for another process's write lock
+
+
+def text_hash(text):
+    """Stable short hash of a composed movie text."""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Candidate Embedding Store.
+    1. In-memory LRU in front (hot movies like the Deep History pool).
+    2. SQLite file behind it, so vectors survive restarts. Shared by every worker process
+       (WAL); capped at max_disk_rows, a locked or broken file just means a miss.
+    Keys are (model, tmdb_id, text_hash) -> a changed plot means a re-encode.
+    """
+
+    def __init__(self, model_name, path=DEFAULT_CACHE_PATH, max_memory_items=DEFAULT_MEMORY_ITEMS, max_disk_rows=DEFAULT_DISK_ROWS):
+        self.model_name = model_name
+        self.path = path
+        self.max_memory_items = max_memory_items
+        self.max_disk_rows = max_disk_rows
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._db = self._open_db(path)
+        self._disk_rows = self._count_rows()
+
+    def _open_db(self, path):
+        try:
+            folder = os.path.dirname(path)
+            if folder: os.makedirs(folder, exist_ok=True)
+            db = sqlite3.connect(path, check_same_thread=False, timeout=BUSY_TIMEOUT)
+            db.execute("PRAGMA journal_mode=WAL") # readers in other processes don't block writers
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT NOT NULL, movie_id INTEGER NOT NULL, text_hash TEXT NOT NULL, "
+                "vector BLOB NOT NULL, PRIMARY KEY (model, movie_id, text_hash))"
+            )
+            db.commit()
+            return db
+        except sqlite3.Error as e:
+            # Read-only disk etc. -> degrade to a memory-only cache
+            print(f"⚠️ Embedding cache disabled on disk: {e}")
+            return None
+
+    def _count_rows(self):
+        if self._db is None: return 0
+        try:
+            return self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+    def _remember(self, key, vec):
+        self._memory[key] = vec
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, keys):
+        """Resolve keys from memory first, then disk. Returns {key: vector}."""
+        found = {}
+        pending = []
+        with self._lock:
+            for key in keys:
+                vec = self._memory.get(key)
+                if vec is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vec
+                    self.hits += 1
+                else:
+                    pending.append(key)
+
+            if pending and self._db is not None:
+                for movie_id, h in pending:
+                    try:
+                        row = self._db.execute(
+                            "SELECT vector FROM embeddings WHERE model=? AND movie_id=? AND text_hash=?",
+                            (self.model_name, movie_id, h),
+                        ).fetchone()
+                    except sqlite3.Error as e:
+                        # Locked past the busy timeout / damaged file: a miss, the caller re-encodes
+                        incr("embedding_cache_errors", op="read")
+                        print(f"⚠️ Embedding cache read failed: {e}")
+                        break
+                    if row:
+                        vec = np.frombuffer(row[0], dtype=np.float32)
+                        found[(movie_id, h)] = vec
+                        self._remember((movie_id, h), vec)
+                        self.disk_hits += 1
+        return found
+
+    def _store(self, items):
+        with self._lock:
+            for key, vec in items:
+                self._remember(key, vec)
+            if self._db is not None:
+                try:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO embeddings (model, movie_id, text_hash, vector) VALUES (?, ?, ?, ?)",
+                        [(self.model_name, k[0], k[1], v.tobytes()) for k, v in items],
+                    )
+                    self._db.commit()
+                    self._disk_rows += len(items)
+                    if self._disk_rows > self.max_disk_rows: self._prune()
+                except sqlite3.Error as e:
+                    incr("embedding_cache_errors", op="write")
+                    print(f"⚠️ Embedding cache write failed: {e}")
+
+    def _prune(self):
+        """
+        Drop the oldest rows (any model) down to 90% of max_disk_rows, so the next prune is
+        a while off. INSERT OR REPLACE gives a rewritten row a new rowid, so rowid order is
+        write order. Called under the lock.
+        """
+        self._db.execute(
+            "DELETE FROM embeddings WHERE rowid NOT IN (SELECT rowid FROM embeddings ORDER BY rowid DESC LIMIT ?)",
+            (self.max_disk_rows * 9 // 10,),
+        )
+        self._db.commit()
+        self._disk_rows = self._count_rows()
+
+    def encode(self, movie_ids, texts, encode_fn):
+        """
+        Return a (len(texts), dim) float32 matrix.
+        Only unseen / changed texts are passed to encode_fn, in one batch.
+        """
+        keys = [(int(mid), text_hash(t)) for mid, t in zip(movie_ids, texts)]
+        found = self._lookup(keys)
+
+        # Deduplicate misses (same movie can appear twice in a pool)
+        missing = {}
+        for i, key in enumerate(keys):
+            if key not in found and key not in missing:
+                missing[key] = i
+
+        if missing:
+            with self._lock:
+                self.misses += len(missing)
+            miss_keys = list(missing)
+            new_vecs = np.asarray(encode_fn([texts[missing[k]] for k in miss_keys]), dtype=np.float32)
+            fresh = list(zip(miss_keys, new_vecs))
+            self._store(fresh)
+            found.update(fresh)
+
+        return np.vstack([found[k] for k in keys]).astype(np.float32, copy=False)
+
+    def get(self, movie_id, text):
+        """Stored vector for this movie text (memory, then disk) or None. Never encodes."""
+        key = (int(movie_id), text_hash(text))
+        return self._lookup([key]).get(key)
+
+    def in_memory(self, movie_ids, texts):
+        """Ids whose current vector is already in the memory LRU (free to score, no disk / model)."""
+        keys = [(int(mid), text_hash(t)) for mid, t in zip(movie_ids, texts)]
+        with self._lock:
+            return {key[0] for key in keys if key in self._memory}
+
+    def stats(self):
+        with self._lock:
+            return {
+                "memory_hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_items": len(self._memory),
+            }
@@ -0,0 +1,281 @@
+"""
+Compact memory-mapped embedding store (replaces movie_embeddings.pkl).
+
+Layout of a store directory:
+    header.json   model name, dim, dtype, row count
+    vectors.npy   (n, dim) float16 or int8, rows L2-normalized before quantization
+    scales.npy    (n,) float32 per-row scale (int8 only)
+    ids.npy       (n,) int64 TMDB ids, row order
+    hashes.npy    (n,) text hash per row (optional, lets generate_embeddings.py skip unchanged rows)
+    neighbours.npy (n, K) int32 rows of each row's K nearest other rows, best first
+                  (optional, serves "More like this" without a matmul)
+
+Every array is opened with mmap, so startup is a few header reads and all Streamlit
+processes on a host share the same pages through the OS page cache.
+
+A rebuild never touches a directory a running app has mapped: each build goes into a new
+version directory (movie_embeddings.v-<ns timestamp>), and movie_embeddings itself is a symlink
+that is swapped to it atomically, so readers always find a complete store at the path.
+
+    python embedding_store.py convert --pkl movie_embeddings.pkl --csv tmdb_5000_movies.csv --out movie_embeddings
+    python embedding_store.py neighbours movie_embeddings --k 50
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+FORMAT_VERSION = 1
+DEFAULT_STORE_DIR = "movie_embeddings"
+SEARCH_CHUNK = 16384 # rows per matmul block, bounds the float32 scratch space
+NEIGHBOURS_K = 50
+NEIGHBOURS_BLOCK = 256 # query rows per search() call while building the table
+
+
+class EmbeddingStore:
+    """Read-only view over a store directory. Same search() contract as VectorIndex."""
+    kind = "mmap"
+
+    def __init__(self, path, attempts=3):
+        self.path = path
+        self._rows = None
+        for attempt in range(attempts):
+            try:
+                return self._open(os.path.realpath(path)) # one version throughout
+            except FileNotFoundError:
+                # Two rebuilds landed while we opened it and the version we resolved is gone
+                if attempt == attempts - 1 or not os.path.islink(path): raise
+
+    def _open(self, root):
+        with open(os.path.join(root, "header.json"), encoding="utf-8") as f:
+            self.header = json.load(f)
+        if self.header.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported embedding store version: {self.header.get('version')}")
+        self.model_name = self.header["model"]
+        self.dim = self.header["dim"]
+        self.vectors = np.load(os.path.join(root, "vectors.npy"), mmap_mode="r")
+        self.ids = np.load(os.path.join(root, "ids.npy"), mmap_mode="r")
+        scales_path = os.path.join(root, "scales.npy")
+        self.scales = np.load(scales_path, mmap_mode="r") if os.path.exists(scales_path) else None
+        hashes_path = os.path.join(root, "hashes.npy")
+        self.hashes = np.load(hashes_path, mmap_mode="r") if os.path.exists(hashes_path) else None
+        neighbours_path = os.path.join(root, "neighbours.npy")
+        self.neighbours = np.load(neighbours_path, mmap_mode="r") if os.path.exists(neighbours_path) else None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def row_of(self, movie_id):
+        """Row for a TMDB id (None if absent). The id map is built on first use."""
+        if self._rows is None:
+            self._rows = {int(i): r for r, i in enumerate(self.ids)}
+        return self._rows.get(int(movie_id))
+
+    def dense(self, rows):
+        """Dequantized float32 vectors for the given rows."""
+        block = np.asarray(self.vectors[rows], dtype=np.float32)
+        if self.scales is not None:
+            block *= np.asarray(self.scales[rows], dtype=np.float32)[..., None]
+        return block
+
+    def search(self, query_vecs, k=50):
+        """Batched exact top-k over the mapped matrix, block by block."""
+        q = np.asarray(query_vecs, dtype=np.float32)
+        if q.ndim == 1: q = q[None, :]
+        q = q / np.maximum(np.linalg.norm(q, axis=1, keepdims=True), 1e-12)
+        k = min(k, len(self))
+
+        best_idx = np.empty((len(q), 0), dtype=np.int64)
+        best_scores = np.empty((len(q), 0), dtype=np.float32)
+        for start in range(0, len(self), SEARCH_CHUNK):
+            stop = min(start + SEARCH_CHUNK, len(self))
+            scores = q @ np.asarray(self.vectors[start:stop], dtype=np.float32).T
+            if self.scales is not None:
+                scores *= np.asarray(self.scales[start:stop], dtype=np.float32)
+            idx = np.tile(np.arange(start, stop), (len(q), 1))
+            best_idx = np.concatenate([best_idx, idx], axis=1)
+            best_scores = np.concatenate([best_scores, scores], axis=1)
+            if best_scores.shape[1] > k:
+                keep = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+                best_idx = np.take_along_axis(best_idx, keep, axis=1)
+                best_scores = np.take_along_axis(best_scores, keep, axis=1)
+
+        order = np.argsort(-best_scores, axis=1)
+        return np.take_along_axis(best_idx, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+
+def _quantize(matrix, dtype):
+    """L2-normalize rows, then quantize -> (vectors, per-row scales or None)."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix = matrix / norms
+    if dtype == "int8":
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        return np.round(matrix / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+    return matrix.astype(np.float16), None
+
+
+def write_store(path, ids, matrix, model_name, dtype="float16", hashes=None):
+    """Normalize, quantize and write a store directory."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    write_store_blocks(path, [(ids, matrix, hashes)], len(matrix), matrix.shape[1], model_name, dtype)
+
+
+def write_store_blocks(path, blocks, count, dim, model_name, dtype="float16"):
+    """
+    Streaming writer: blocks of (ids, matrix, hashes or None) go straight into .npy
+    memmaps, so a catalog never has to fit in memory as float32.
+    """
+    if dtype not in ("float16", "int8"):
+        raise ValueError(f"dtype must be float16 or int8, got {dtype}")
+    tmp = f"{path.rstrip(os.sep)}.v-{time.time_ns()}" # unique per build, never the live version
+    if os.path.exists(tmp): shutil.rmtree(tmp)
+    os.makedirs(tmp)
+
+    open_memmap = np.lib.format.open_memmap
+    vectors = open_memmap(os.path.join(tmp, "vectors.npy"), mode="w+", dtype=np.dtype(dtype), shape=(count, dim))
+    ids_out = open_memmap(os.path.join(tmp, "ids.npy"), mode="w+", dtype=np.int64, shape=(count,))
+    scales = open_memmap(os.path.join(tmp, "scales.npy"), mode="w+", dtype=np.float32, shape=(count,)) if dtype == "int8" else None
+    hashes = []
+    row = 0
+    for block_ids, block, block_hashes in blocks:
+        quantized, block_scales = _quantize(block, dtype)
+        n = len(quantized)
+        vectors[row:row + n] = quantized
+        ids_out[row:row + n] = np.asarray(block_ids, dtype=np.int64)
+        if scales is not None: scales[row:row + n] = block_scales
+        if hashes is not None and block_hashes is not None: hashes.extend(block_hashes)
+        else: hashes = None
+        row += n
+    if row != count:
+        raise ValueError(f"expected {count} rows, got {row}")
+    for array in (vectors, ids_out, scales):
+        if array is not None: array.flush()
+    del vectors, ids_out, scales
+    if hashes is not None:
+        np.save(os.path.join(tmp, "hashes.npy"), np.asarray(hashes, dtype="U40"))
+
+    # Header last: a store without one is incomplete and won't open
+    with open(os.path.join(tmp, "header.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "version": FORMAT_VERSION,
+            "model": model_name,
+            "dim": int(dim),
+            "dtype": dtype,
+            "count": int(count),
+        }, f, indent=2)
+
+    _swap_in(path, tmp)
+
+
+def _swap_in(path, version):
+    """
+    Point the path symlink at a finished version directory (os.replace of a new link, so
+    path never goes missing). The version it replaces is kept, a reader may be opening it
+    right now; older complete versions are removed (their mappings outlive the unlink).
+    """
+    path = path.rstrip(os.sep)
+    previous = os.path.realpath(path) if os.path.islink(path) else None
+    if os.path.isdir(path) and previous is None:
+        # Plain directory from before versioned stores: moved aside once, the only
+        # swap with a moment where path doesn't exist
+        previous = f"{path}.v-legacy"
+        if os.path.exists(previous): shutil.rmtree(previous)
+        os.replace(path, previous)
+    link = f"{path}.link-{os.getpid()}"
+    if os.path.lexists(link): os.remove(link)
+    try:
+        os.symlink(os.path.basename(version), link, target_is_directory=True)
+    except (OSError, NotImplementedError): # no symlinks here (e.g. Windows without the privilege)
+        if previous and os.path.exists(previous) and not os.path.exists(path): os.replace(previous, path)
+        old = f"{path}.old-{os.getpid()}"
+        if os.path.exists(path): os.replace(path, old)
+        os.replace(version, path)
+        if os.path.exists(old): shutil.rmtree(old)
+        return
+    os.replace(link, path)
+
+    parent = os.path.dirname(path) or "."
+    prefix = os.path.basename(path) + ".v-"
+    keep = {os.path.realpath(version), os.path.realpath(previous) if previous else None}
+    for name in os.listdir(parent):
+        stale = os.path.join(parent, name)
+        if name.startswith(prefix) and os.path.realpath(stale) not in keep and os.path.exists(os.path.join(stale, "header.json")):
+            shutil.rmtree(stale)
+
+
+def build_neighbours(store, k=NEIGHBOURS_K):
+    """(n, k) int32 table: for every row, its k nearest other rows, best first."""
+    k = min(k, len(store) - 1)
+    table = np.empty((len(store), max(k, 0)), dtype=np.int32)
+    if k <= 0: return table
+    for start in range(0, len(store), NEIGHBOURS_BLOCK):
+        rows = np.arange(start, min(start + NEIGHBOURS_BLOCK, len(store)))
+        found, _ = store.search(store.dense(rows), k + 1)
+        for row, hits in zip(rows, found):
+            table[row] = hits[hits != row][:k] # drop the row itself (or the last hit, for a duplicate vector)
+    return table
+
+
+def write_neighbours(path, k=NEIGHBOURS_K):
+    """Add / refresh neighbours.npy in an existing store (atomic; running apps keep the old one)."""
+    table = build_neighbours(EmbeddingStore(path), k)
+    tmp = os.path.join(path, f"neighbours.tmp-{os.getpid()}.npy")
+    np.save(tmp, table)
+    os.replace(tmp, os.path.join(path, "neighbours.npy"))
+    return table.shape
+
+
+def convert_pickle(pkl_path, csv_path, out_path, model_name, dtype="float16"):
+    """One-off converter from the legacy movie_embeddings.pkl."""
+    import pickle
+    import pandas as pd
+    from vector_index import embedding_matrix
+
+    with open(pkl_path, "rb") as f:
+        embeddings = pickle.load(f)
+    df = pd.read_csv(csv_path, usecols=["id"])
+    ids, matrix = embedding_matrix(embeddings, df)
+    write_store(out_path, ids, matrix, model_name, dtype)
+    return len(ids)
+
+
+def main():
+    from core import MODEL_NAME
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    conv = sub.add_parser("convert", help="movie_embeddings.pkl -> mmap store")
+    conv.add_argument("--pkl", default="movie_embeddings.pkl")
+    conv.add_argument("--csv", default="tmdb_5000_movies.csv")
+    conv.add_argument("--out", default=DEFAULT_STORE_DIR)
+    conv.add_argument("--dtype", choices=["float16", "int8"], default="float16")
+    conv.add_argument("--model", default=MODEL_NAME)
+    info = sub.add_parser("info", help="print a store header and its open time")
+    info.add_argument("path", nargs="?", default=DEFAULT_STORE_DIR)
+    neigh = sub.add_parser("neighbours", help="precompute the top-k neighbour table")
+    neigh.add_argument("path", nargs="?", default=DEFAULT_STORE_DIR)
+    neigh.add_argument("--k", type=int, default=NEIGHBOURS_K)
+    args = parser.parse_args()
+
+    if args.cmd == "convert":
+        n = convert_pickle(args.pkl, args.csv, args.out, args.model, args.dtype)
+        print(f"✅ Wrote {n} vectors ({args.dtype}) to {args.out}/")
+    elif args.cmd == "neighbours":
+        started = time.perf_counter()
+        rows, k = write_neighbours(args.path, args.k)
+        print(f"✅ Wrote {k} neighbours for {rows} rows to {args.path}/neighbours.npy in {time.perf_counter() - started:.1f}s")
+    else:
+        started = time.perf_counter()
+        store = EmbeddingStore(args.path)
+        print(json.dumps(store.header, indent=2))
+        print(f"Opened in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
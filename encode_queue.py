@@ -0,0 +1,111 @@
+"""
+Cross-session micro-batching for the shared encoder.
+
+Every Streamlit session thread used to call model.encode on its own: lots of tiny calls
+fighting over the same CPU threads. EncodeQueue sits in front of the encoder instead.
+Callers submit texts and block on a future; one worker thread drains the queue and
+encodes a batch once it holds max_batch texts or the oldest request has waited
+max_wait_ms. Identical texts in a batch (two sessions typing the same query, a movie
+in several pools) are encoded once.
+
+LUMINA_ENCODE_WAIT_MS sets the wait (default 5, 0 = call the encoder directly) and
+LUMINA_ENCODE_MAX_BATCH the size limit. The worker only holds the queue weakly, so a
+dropped EncodeQueue (and its metrics collector) is collected and the thread exits.
+"""
+import os
+import queue
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+
+import numpy as np
+
+from metrics import incr, observe, register_collector
+
+ENCODE_WAIT_MS = float(os.getenv("LUMINA_ENCODE_WAIT_MS", 5))
+ENCODE_MAX_BATCH = int(os.getenv("LUMINA_ENCODE_MAX_BATCH", 64))
+
+
+class EncodeQueue:
+    """Drop-in for an encoder (encode / cache_name) that batches calls across threads."""
+
+    def __init__(self, encoder, max_batch=ENCODE_MAX_BATCH, max_wait_ms=ENCODE_WAIT_MS):
+        self.encoder = encoder
+        if getattr(encoder, "cache_name", None):
+            self.cache_name = encoder.cache_name # else callers fall back to their model name
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=_work, args=(weakref.ref(self), self._queue), name="encode-queue", daemon=True)
+        self._worker.start()
+        register_collector(self._collect)
+
+    def submit(self, texts):
+        """Future resolving to a float32 (len(texts), dim) matrix."""
+        future = Future()
+        self._queue.put((list(texts), future, time.monotonic()))
+        return future
+
+    def encode(self, texts):
+        return self.submit(texts).result()
+
+    def _drain(self, first):
+        batch = [first]
+        size = len(first[0])
+        deadline = first[2] + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0: break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[0])
+        self._flush(batch, size)
+
+    def _flush(self, batch, size):
+        started = time.monotonic()
+        for _, _, queued_at in batch:
+            observe("encode_queue_wait_seconds", started - queued_at)
+
+        unique = list(dict.fromkeys(t for texts, _, _ in batch for t in texts))
+        observe("encode_batch_size", len(unique))
+        observe("encode_batch_callers", len(batch))
+        if size > len(unique): incr("encode_deduped_texts", size - len(unique))
+
+        try:
+            vecs = np.asarray(self.encoder.encode(unique), dtype=np.float32) if unique else None
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+
+        row = {t: i for i, t in enumerate(unique)}
+        for texts, future, _ in batch:
+            if texts: future.set_result(vecs[[row[t] for t in texts]])
+            else: future.set_result(np.empty((0, 0), dtype=np.float32))
+
+    def _collect(self):
+        yield "encode_queue_depth", {}, self._queue.qsize()
+
+
+def _work(ref, jobs, idle=1.0):
+    """Worker loop: drains jobs for the EncodeQueue behind ref, exits once it is gone."""
+    while True:
+        try:
+            first = jobs.get(timeout=idle)
+        except queue.Empty:
+            if ref() is None: return
+            continue
+        owner = ref()
+        if owner is None: return
+        owner._drain(first)
+        del owner
+
+
+def batched(encoder, max_wait_ms=ENCODE_WAIT_MS):
+    """Wrap encoder in an EncodeQueue unless batching is switched off (wait 0)."""
+    if max_wait_ms <= 0: return encoder
+    return EncodeQueue(encoder, max_wait_ms=max_wait_ms)
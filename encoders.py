@@ -0,0 +1,103 @@
+"""
+Encoder backends for the ContentEngine.
+
+    torch       full-precision SentenceTransformer (the original behaviour)
+    torch-int8  same model with dynamically int8-quantized Linear layers
+    onnx        ONNX Runtime export via sentence-transformers' onnx backend
+
+Pick one per deployment with LUMINA_ENCODER, and tune it with LUMINA_ENCODER_BATCH,
+LUMINA_ENCODER_MAX_SEQ and LUMINA_ENCODER_THREADS. benchmarks/bench_encoders.py compares
+throughput and ranking overlap against the float baseline.
+"""
+import os
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+DEFAULT_BACKEND = "torch"
+
+
+class Encoder(ABC):
+    """
+    encode(texts) -> float32 (n, dim). cache_name keys the embedding cache per backend;
+    the default backend keeps the plain model name, so caches from before backends still hit.
+    """
+    backend = None
+
+    def __init__(self, model_name, batch_size=64, max_seq_length=None, threads=None):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_seq_length = max_seq_length
+        self.threads = threads
+        self.cache_name = model_name if self.backend == DEFAULT_BACKEND else f"{model_name}@{self.backend}"
+        self.model = self._load()
+        if max_seq_length:
+            self.model.max_seq_length = max_seq_length
+
+    @abstractmethod
+    def _load(self):
+        """The SentenceTransformer-like model behind encode()."""
+
+    def encode(self, texts):
+        vecs = self.model.encode(list(texts), batch_size=self.batch_size, show_progress_bar=False, convert_to_numpy=True)
+        return np.asarray(vecs, dtype=np.float32)
+
+
+class TorchEncoder(Encoder):
+    backend = "torch"
+
+    def _load(self):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if self.threads: torch.set_num_threads(self.threads)
+        return SentenceTransformer(self.model_name, device="cpu")
+
+
+class QuantizedTorchEncoder(TorchEncoder):
+    """Dynamic int8 quantization of the Linear layers (weights int8, activations quantized on the fly)."""
+    backend = "torch-int8"
+
+    def _load(self):
+        import torch
+
+        model = super()._load()
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class OnnxEncoder(Encoder):
+    """ONNX Runtime on CPU (needs sentence-transformers[onnx], i.e. optimum + onnxruntime)."""
+    backend = "onnx"
+
+    def _load(self):
+        import onnxruntime as ort
+        from sentence_transformers import SentenceTransformer
+
+        options = ort.SessionOptions()
+        if self.threads:
+            options.intra_op_num_threads = self.threads
+        return SentenceTransformer(
+            self.model_name, device="cpu", backend="onnx",
+            model_kwargs={"provider": "CPUExecutionProvider", "session_options": options},
+        )
+
+
+BACKENDS = {cls.backend: cls for cls in (TorchEncoder, QuantizedTorchEncoder, OnnxEncoder)}
+
+
+def _env_int(name):
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+def make_encoder(model_name, backend=None, batch_size=None, max_seq_length=None, threads=None):
+    """Build an encoder; unset options come from the LUMINA_ENCODER* environment."""
+    backend = backend or os.getenv("LUMINA_ENCODER", DEFAULT_BACKEND)
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown encoder backend '{backend}' (choose from {', '.join(BACKENDS)})")
+    return BACKENDS[backend](
+        model_name,
+        batch_size=batch_size or _env_int("LUMINA_ENCODER_BATCH") or 64,
+        max_seq_length=max_seq_length or _env_int("LUMINA_ENCODER_MAX_SEQ"),
+        threads=threads or _env_int("LUMINA_ENCODER_THREADS"),
+    )
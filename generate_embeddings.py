@@ -0,0 +1,223 @@
+"""
+Offline embedding build: tmdb_5000_movies.csv (or any bigger catalog dump with the same
+columns) -> the mmap store in movie_embeddings/.
+
+    python generate_embeddings.py --workers 4
+    python generate_embeddings.py --csv catalog.csv --chunk-rows 8192 --dtype int8
+
+1. The CSV is streamed in chunks; texts are composed exactly like rank_candidates does.
+2. Rows go to a process pool, each worker with its own encoder and its share of the cores.
+3. Every finished chunk is checkpointed as a shard in the work dir. After a crash, the
+   same command resumes: shards whose rows are unchanged are not redone.
+4. On a rebuild, a row is only re-encoded if its text hash changed (vectors are reused
+   from the old shard or the previous store).
+5. The shards are streamed into a fresh store, swapped in next to the old one.
+6. The store gets its "More like this" neighbour table (--neighbours 0 skips it).
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from core import CSV_PATH, MODEL_NAME, STORE_PATH, compose_text
+from embedding_cache import text_hash
+from embedding_store import NEIGHBOURS_K, EmbeddingStore, write_neighbours, write_store_blocks
+
+WORK_DIR = os.path.join(".cache", "embedding_build")
+CSV_COLUMNS = ["id", "title", "overview", "release_date"]
+
+_encoder = None
+
+
+# --- WORKER PROCESS ---
+def _init_worker(model_name, backend, batch_size, threads):
+    global _encoder
+    from encoders import make_encoder
+    _encoder = make_encoder(model_name, backend, batch_size=batch_size, threads=threads)
+
+
+def _encode(texts):
+    return np.asarray(_encoder.encode(texts), dtype=np.float32)
+
+
+# --- CHUNKS & SHARDS ---
+def read_chunks(csv_path, chunk_rows):
+    """(ids, texts, hashes) per CSV chunk, never the whole file at once."""
+    import pandas as pd
+
+    for chunk in pd.read_csv(csv_path, usecols=CSV_COLUMNS, chunksize=chunk_rows):
+        chunk = chunk.drop_duplicates("id")
+        ids = chunk["id"].astype(np.int64).values
+        texts = [
+            compose_text({
+                "title": title if isinstance(title, str) else "",
+                "overview": overview if isinstance(overview, str) else "",
+                "release_date": release if isinstance(release, str) else "",
+            })
+            for title, overview, release in zip(chunk["title"], chunk["overview"], chunk["release_date"])
+        ]
+        yield ids, texts, [text_hash(t) for t in texts]
+
+
+def shard_path(work_dir, n):
+    return os.path.join(work_dir, f"shard-{n:05d}.npz")
+
+
+def load_shard(path):
+    if not os.path.exists(path): return None
+    try:
+        with np.load(path) as data:
+            return data["ids"], data["hashes"], data["vectors"]
+    except Exception as e: # torn write from a crash -> redo this chunk
+        print(f"⚠️ Ignoring unreadable shard {path}: {e}")
+        return None
+
+
+def save_shard(path, ids, hashes, vectors):
+    tmp = path[:-len(".npz")] + ".tmp.npz"
+    np.savez(tmp, ids=ids, hashes=np.asarray(hashes, dtype="U40"), vectors=vectors)
+    os.replace(tmp, path) # a shard either exists whole or not at all
+
+
+def prepare_work_dir(work_dir, settings):
+    """Shards are only reusable with the same model and chunking; otherwise start over."""
+    manifest = os.path.join(work_dir, "manifest.json")
+    if os.path.exists(manifest):
+        with open(manifest, encoding="utf-8") as f:
+            if json.load(f) == settings: return
+        print("♻️ Build settings changed, discarding old shards.")
+        shutil.rmtree(work_dir)
+    os.makedirs(work_dir, exist_ok=True)
+    with open(manifest, "w", encoding="utf-8") as f:
+        json.dump(settings, f, indent=2)
+
+
+class Reuse:
+    """Vectors we already have, by (id, text hash): this chunk's old shard, then the previous store."""
+
+    def __init__(self, store):
+        self.store = store if store is not None and store.hashes is not None else None
+
+    def lookup(self, ids, hashes, shard):
+        vectors = [None] * len(ids)
+        if shard is not None:
+            known = {(int(i), str(h)): v for i, h, v in zip(*shard)}
+            for j, key in enumerate(zip(ids.tolist(), hashes)):
+                vectors[j] = known.get(key)
+        if self.store is not None:
+            for j, (movie_id, h) in enumerate(zip(ids.tolist(), hashes)):
+                if vectors[j] is not None: continue
+                row = self.store.row_of(movie_id)
+                if row is not None and str(self.store.hashes[row]) == h:
+                    vectors[j] = self.store.dense([row])[0]
+        return vectors
+
+
+# --- BUILD ---
+def build(args):
+    settings = {"model": args.model, "backend": args.backend or os.getenv("LUMINA_ENCODER", "torch"), "chunk_rows": args.chunk_rows, "csv": os.path.abspath(args.csv)}
+    prepare_work_dir(args.work_dir, settings)
+
+    previous = None
+    if os.path.exists(os.path.join(args.out, "header.json")):
+        previous = EmbeddingStore(args.out)
+        if previous.model_name != args.model: previous = None
+    reuse = Reuse(previous)
+
+    workers = max(args.workers, 1)
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"), # torch + fork don't mix
+        initializer=_init_worker,
+        initargs=(args.model, args.backend, args.batch_size, threads),
+    )
+
+    started = time.perf_counter()
+    totals = {"rows": 0, "encoded": 0, "reused": 0, "resumed": 0}
+    shards = []
+    pending = {}
+
+    def finish(n, ids, hashes, vectors, todo, fresh):
+        for j, vec in zip(todo, fresh):
+            vectors[j] = vec
+        save_shard(shard_path(args.work_dir, n), ids, hashes, np.vstack(vectors).astype(np.float32))
+        totals["encoded"] += len(todo)
+        elapsed = time.perf_counter() - started
+        print(f"📦 Shard {n}: {len(ids)} rows ({len(todo)} encoded) | {totals['rows'] / elapsed:.0f} rows/s")
+
+    def drain(limit):
+        while len(pending) > limit:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                finish(*pending.pop(fut), fut.result())
+
+    try:
+        for n, (ids, texts, hashes) in enumerate(read_chunks(args.csv, args.chunk_rows)):
+            shards.append((n, len(ids)))
+            totals["rows"] += len(ids)
+            shard = load_shard(shard_path(args.work_dir, n))
+            if shard is not None and np.array_equal(shard[0], ids) and list(shard[1]) == hashes:
+                totals["resumed"] += len(ids)
+                continue
+
+            vectors = reuse.lookup(ids, hashes, shard)
+            todo = [j for j, v in enumerate(vectors) if v is None]
+            totals["reused"] += len(ids) - len(todo)
+            if not todo:
+                finish(n, ids, hashes, vectors, [], [])
+                continue
+            pending[pool.submit(_encode, [texts[j] for j in todo])] = (n, ids, hashes, vectors, todo)
+            drain(workers * 2) # bounded in-flight chunks -> bounded memory
+        drain(0)
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+    # Drop shards beyond the end of a catalog that shrank
+    for name in os.listdir(args.work_dir):
+        if name.startswith("shard-") and name.endswith(".npz") and int(name[6:11]) >= len(shards):
+            os.remove(os.path.join(args.work_dir, name))
+
+    elapsed = time.perf_counter() - started
+    count = sum(rows for _, rows in shards)
+    dim = load_shard(shard_path(args.work_dir, 0))[2].shape[1] if shards else 0
+
+    def blocks():
+        for n, _ in shards:
+            ids, hashes, vectors = load_shard(shard_path(args.work_dir, n))
+            yield ids, vectors, [str(h) for h in hashes]
+
+    write_store_blocks(args.out, blocks(), count, dim, args.model, args.dtype)
+    if args.neighbours:
+        rows, k = write_neighbours(args.out, args.neighbours)
+        print(f"🔗 Neighbour table: {k} per movie")
+    print(
+        f"✅ {count} rows -> {args.out}/ ({args.dtype}) in {elapsed:.1f}s: "
+        f"{totals['encoded']} encoded, {totals['reused']} reused, {totals['resumed']} resumed | "
+        f"{count / elapsed:.0f} rows/s overall, {totals['encoded'] / elapsed:.0f} encoded rows/s"
+    )
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--out", default=STORE_PATH)
+    parser.add_argument("--work-dir", default=WORK_DIR, help="checkpointed shards (keep it for fast rebuilds)")
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--backend", default=None, help="encoder backend (default: LUMINA_ENCODER or torch)")
+    parser.add_argument("--dtype", choices=["float16", "int8"], default="float16")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--chunk-rows", type=int, default=2048)
+    parser.add_argument("--batch-size", type=int, default=128)
+    parser.add_argument("--neighbours", type=int, default=NEIGHBOURS_K, help="top-k neighbour table width (0 = none)")
+    build(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
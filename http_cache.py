@@ -0,0 +1,154 @@
+"""
+Persistent TMDB response cache (SQLite, shared by every worker process on the host).
+
+Entries are keyed by URL + normalized params with the api_key dropped. Each endpoint has
+its own TTL; past it, an entry is still served for STALE_WINDOW seconds while a background
+request revalidates it (stale-while-revalidate). Revalidation is conditional: the stored
+ETag / Last-Modified go out as If-None-Match / If-Modified-Since and a 304 just renews it.
+If TMDB is down, an expired entry beats no answer (stale-if-error).
+Network calls go through an optional gate (the rate limiter); a refused gate is a failure.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from metrics import incr
+
+DEFAULT_PATH = os.path.join(".cache", "tmdb_responses.sqlite")
+
+# Seconds an entry counts as fresh, by endpoint (ids collapsed to {id})
+ENDPOINT_TTLS = {
+    "/trending/movie/day": 3600,
+    "/search/movie": 6 * 3600,
+    "/search/keyword": 7 * 24 * 3600,
+    "/discover/movie": 6 * 3600,
+    "/movie/{id}": 7 * 24 * 3600,
+}
+DEFAULT_TTL = 3600
+STALE_WINDOW = 24 * 3600
+
+
+def cache_key(url, params):
+    clean = sorted((k, str(v)) for k, v in params.items() if k != "api_key")
+    return url + "?" + "&".join(f"{k}={v}" for k, v in clean)
+
+
+class HttpCache:
+    def __init__(self, path=DEFAULT_PATH, ttls=ENDPOINT_TTLS, stale_window=STALE_WINDOW):
+        self.ttls = ttls
+        self.stale_window = stale_window
+        self._lock = threading.Lock()
+        self._revalidating = set()
+        self._db = self._open(path)
+
+    def _open(self, path):
+        if not path: return None # disabled (e.g. cold-cache benchmarks)
+        try:
+            folder = os.path.dirname(path)
+            if folder: os.makedirs(folder, exist_ok=True)
+            db = sqlite3.connect(path, check_same_thread=False, timeout=5)
+            db.execute("PRAGMA journal_mode=WAL") # readers in other processes don't block writers
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, body TEXT NOT NULL, etag TEXT, last_modified TEXT, fetched_at REAL NOT NULL)"
+            )
+            db.commit()
+            return db
+        except sqlite3.Error as e:
+            print(f"⚠️ TMDB response cache disabled: {e}")
+            return None
+
+    def _read(self, key):
+        if self._db is None: return None
+        with self._lock:
+            return self._db.execute(
+                "SELECT body, etag, last_modified, fetched_at FROM responses WHERE key=?", (key,)
+            ).fetchone()
+
+    def _write(self, key, body, etag, last_modified):
+        if self._db is None: return
+        with self._lock:
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, body, etag, last_modified, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, body, etag, last_modified, time.time()),
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️ TMDB response cache write failed: {e}")
+
+    def _touch(self, key):
+        if self._db is None: return
+        with self._lock:
+            self._db.execute("UPDATE responses SET fetched_at=? WHERE key=?", (time.time(), key))
+            self._db.commit()
+
+    def _request(self, session, url, params, timeout, key, row, gate=None):
+        """Network call (conditional when we hold a copy). Returns parsed JSON or None."""
+        if gate is not None and not gate():
+            incr("http_cache", result="throttled")
+            return None
+        headers = {}
+        if row:
+            if row[1]: headers["If-None-Match"] = row[1]
+            if row[2]: headers["If-Modified-Since"] = row[2]
+        resp = session.get(url, params=params, timeout=timeout, headers=headers)
+        if resp.status_code == 304 and row:
+            self._touch(key)
+            incr("http_cache", result="not_modified")
+            return json.loads(row[0])
+        if resp.status_code == 200:
+            self._write(key, resp.text, resp.headers.get("ETag"), resp.headers.get("Last-Modified"))
+            return resp.json()
+        return None
+
+    def _revalidate(self, session, url, params, timeout, key, row, gate=None):
+        try:
+            self._request(session, url, params, timeout, key, row, gate)
+        except Exception as e:
+            incr("http_cache", result="revalidate_failed")
+            print(f"⚠️ Revalidation failed for {url}: {e}")
+        finally:
+            with self._lock:
+                self._revalidating.discard(key)
+
+    def get_json(self, session, url, params, endpoint, timeout=None, executor=None, gate=None, background_gate=None):
+        """
+        Cached GET -> parsed JSON, or None if there is no usable answer.
+        executor runs background revalidations (a thread is spawned without one).
+        gate / background_gate are called before a foreground / revalidation request;
+        returning False skips it.
+        """
+        key = cache_key(url, params)
+        row = self._read(key)
+        age = time.time() - row[3] if row else None
+        ttl = self.ttls.get(endpoint, DEFAULT_TTL)
+
+        if row and age < ttl:
+            incr("http_cache", result="fresh")
+            return json.loads(row[0])
+
+        if row and age < ttl + self.stale_window:
+            incr("http_cache", result="stale")
+            with self._lock:
+                start = key not in self._revalidating
+                self._revalidating.add(key)
+            if start:
+                args = (session, url, params, timeout, key, row, background_gate or gate)
+                if executor is not None: executor.submit(self._revalidate, *args)
+                else: threading.Thread(target=self._revalidate, args=args, daemon=True).start()
+            return json.loads(row[0])
+
+        incr("http_cache", result="miss")
+        try:
+            data = self._request(session, url, params, timeout, key, row, gate)
+        except Exception as e:
+            incr("http_cache", result="error")
+            print(f"⚠️ TMDB request failed for {endpoint}: {e}")
+            data = None
+        if data is None and row:
+            incr("http_cache", result="stale_on_error")
+            return json.loads(row[0])
+        return data
@@ -0,0 +1,160 @@
+"""
+In-process metrics for the search pipeline.
+Timing spans and value samples go into rolling histograms, counters are monotonic,
+and registered collectors contribute gauges (cache sizes, hit counts...) at dump time.
+"""
+import inspect
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+PREFIX = "lumina"
+WINDOW = 1000 # samples kept per histogram
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs: return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class Histogram:
+    """Rolling window of the last WINDOW samples, plus lifetime count / sum."""
+    __slots__ = ("samples", "count", "total")
+
+    def __init__(self, window=WINDOW):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def quantiles(self, qs=QUANTILES):
+        if not self.samples: return {q: 0.0 for q in qs}
+        values = np.quantile(np.fromiter(self.samples, dtype=np.float64), qs)
+        return dict(zip(qs, values.tolist()))
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._collectors = []
+
+    def observe(self, name, value, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram()
+            hist.add(value)
+
+    def incr(self, name, n=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + n
+
+    def counter(self, name, **labels):
+        with self._lock:
+            return self._counters.get(_key(name, labels), 0)
+
+    @contextmanager
+    def span(self, stage, **labels):
+        """Time a block into the 'stage_seconds' histogram."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("stage_seconds", time.perf_counter() - started, stage=stage, **labels)
+
+    def register_collector(self, fn):
+        """
+        fn() -> iterable of (gauge_name, labels_dict, value), read at dump time.
+        Held weakly: a bound method's collector goes away with its object.
+        """
+        ref = weakref.WeakMethod(fn) if inspect.ismethod(fn) else weakref.ref(fn)
+        with self._lock:
+            self._collectors.append(ref)
+
+    def _gauges(self):
+        with self._lock:
+            self._collectors = [ref for ref in self._collectors if ref() is not None]
+            collectors = [ref() for ref in self._collectors]
+        gauges = []
+        for fn in collectors:
+            if fn is None: continue
+            try:
+                gauges.extend((name, _key(name, labels)[1], value) for name, labels, value in fn())
+            except Exception:
+                pass
+        return sorted(gauges)
+
+    def snapshot(self):
+        """Plain-dict view (for the debug panel / logs)."""
+        with self._lock:
+            hists = {k: (h.count, h.total, h.quantiles()) for k, h in self._histograms.items()}
+            counters = dict(self._counters)
+        return {
+            "histograms": [
+                {"name": name, **dict(labels), "count": c, "mean": total / c if c else 0.0,
+                 "p50": q[0.5], "p95": q[0.95], "p99": q[0.99]}
+                for (name, labels), (c, total, q) in sorted(hists.items())
+            ],
+            "counters": {f"{name}{_fmt_labels(labels)}": v for (name, labels), v in sorted(counters.items())},
+            "gauges": {f"{name}{_fmt_labels(labels)}": v for name, labels, v in self._gauges()},
+        }
+
+    def prometheus_text(self):
+        """Prometheus text exposition format (histograms are exported as summaries)."""
+        lines = []
+        with self._lock:
+            hists = sorted((k, (h.count, h.total, h.quantiles())) for k, h in self._histograms.items())
+            counters = sorted(self._counters.items())
+
+        typed = set()
+        for (name, labels), (count, total, qs) in hists:
+            metric = f"{PREFIX}_{name}"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} summary")
+                typed.add(metric)
+            for q, v in qs.items():
+                lines.append(f"{metric}{_fmt_labels(labels, [('quantile', q)])} {v:.6g}")
+            lines.append(f"{metric}_count{_fmt_labels(labels)} {count}")
+            lines.append(f"{metric}_sum{_fmt_labels(labels)} {total:.6g}")
+
+        for (name, labels), value in counters:
+            metric = f"{PREFIX}_{name}_total"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{metric}{_fmt_labels(labels)} {value}")
+
+        for name, labels, value in self._gauges():
+            metric = f"{PREFIX}_{name}"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} gauge")
+                typed.add(metric)
+            lines.append(f"{metric}{_fmt_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+
+# Module-level shortcuts
+observe = METRICS.observe
+incr = METRICS.incr
+span = METRICS.span
+register_collector = METRICS.register_collector
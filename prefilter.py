@@ -0,0 +1,102 @@
+"""
+Stage 1 of two-stage retrieval: a cheap lexical pass (BM25 over title + overview) that
+decides which candidates are worth a transformer encode.
+
+Candidates whose vector is already at hand (classics pool, embedding cache memory) are
+always kept: scoring them is free. At most N of the rest go through, in this order:
+exact title matches, titles containing a long query word (whole words), then BM25 over
+title + overview (pool order breaks ties, so direct search hits go first).
+
+BM25 takes its IDF from a corpus (corpus_stats over the local catalog) when there is one,
+so scores mean the same in every streamed batch; without one, from the batch itself.
+
+LUMINA_PREFILTER_N sets N; 0 (the default) turns stage 1 off. It costs recall: see
+benchmarks/bench_prefilter.py and the README for numbers against encoding everything.
+"""
+import math
+import os
+import re
+from collections import Counter
+
+import numpy as np
+
+PREFILTER_N = int(os.getenv("LUMINA_PREFILTER_N", 0))
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has he her his in is it its of on or she that the "
+    "their they this to was were who with movie film".split()
+)
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def _idf(n_docs, df):
+    return math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+
+
+def corpus_stats(docs):
+    """(document frequencies, doc count, average length) of a tokenized corpus, for bm25_scores."""
+    df = Counter()
+    total = 0
+    for d in docs:
+        df.update(set(d))
+        total += len(d)
+    return df, len(docs), max(total / max(len(docs), 1), 1.0)
+
+
+def bm25_scores(query, docs, k1=1.5, b=0.75, stats=None):
+    """
+    BM25 of one query against token lists. IDF and average length come from stats
+    (corpus_stats) if given, else from docs themselves.
+    """
+    terms = set(tokenize(query))
+    scores = np.zeros(len(docs), dtype=np.float32)
+    if not terms or not docs: return scores
+
+    lengths = np.array([len(d) for d in docs], dtype=np.float32)
+    counts = [Counter(d) for d in docs]
+    if stats is not None:
+        corpus_df, n_docs, avg_len = stats
+    else:
+        corpus_df, n_docs, avg_len = None, len(docs), max(float(lengths.mean()), 1.0)
+    for term in terms:
+        tf = np.array([c.get(term, 0) for c in counts], dtype=np.float32)
+        if not tf.any(): continue
+        df = corpus_df.get(term, 0) if corpus_df is not None else int(np.count_nonzero(tf))
+        scores += _idf(n_docs, df) * tf * (k1 + 1) / (tf + k1 * (1 - b + b * lengths / avg_len))
+    return scores
+
+
+def prefilter(candidates, query, n=PREFILTER_N, free_ids=(), stats=None):
+    """
+    Indices (pool order) of the candidates that go on to the transformer stage.
+    free_ids: ids whose vectors need no encode; they never count against n.
+    stats: corpus_stats for BM25's IDF. n=None keeps everything; n=0 keeps only free ids.
+    """
+    if n is None or len(candidates) <= n or not query or not query.strip():
+        return list(range(len(candidates)))
+
+    query_lower = query.lower().strip()
+    long_words = {w for w in tokenize(query) if len(w) > 3}
+
+    keep = []
+    rest = []
+    for i, movie in enumerate(candidates):
+        if movie['id'] in free_ids: keep.append(i)
+        else: rest.append(i)
+    if not rest or n <= 0: return sorted(keep)
+
+    docs = [tokenize(f"{candidates[i].get('title', '')} {candidates[i].get('overview', '')}") for i in rest]
+    scores = bm25_scores(query, docs, stats=stats)
+    tier = np.zeros(len(rest), dtype=np.int8) # 0 exact title, 1 long query word in the title, 2 other
+    for j, i in enumerate(rest):
+        title = candidates[i].get('title', '').lower()
+        if title == query_lower: tier[j] = 0
+        elif long_words & set(tokenize(title)): tier[j] = 1
+        else: tier[j] = 2
+    order = np.lexsort((np.arange(len(rest)), -scores, tier))[:n]
+    keep.extend(rest[j] for j in order)
+    return sorted(keep)
@@ -0,0 +1,29 @@
+# THE ELITE 25 LIST ("Surprise Me")
+# Shared by app.py and the benchmarks, so keep it importable without Streamlit.
+SURPRISE_PROMPTS = [
+    "A movie where the setting feels like a character itself",
+    "Technicolor dreams and 80s synth-wave vibes",
+    "Movies that feel like a warm hug on a rainy Sunday",
+    "Something that will make me question my own reality",
+    "Visually stunning masterpieces with very little dialogue",
+    "A gritty story of redemption in a cold city",
+    "Movies about the beauty and terror of the deep ocean",
+    "Mind-bending puzzles that require a second viewing",
+    "The feeling of being lost in a massive, futuristic metropolis",
+    "Small-town mysteries with a dark, supernatural undertone",
+    "Heartbreaking stories about the passage of time",
+    "High-stakes heist movies with a sophisticated plan",
+    "Something to watch when I want to feel inspired to change the world",
+    "Isolation in space where silence is the loudest sound",
+    "Coming-of-age stories that feel painfully nostalgic",
+    "Dark comedies that make you laugh at things you shouldn't",
+    "Epic historical journeys across vast, beautiful landscapes",
+    "The chaotic energy of a high-pressure kitchen or workplace",
+    "Quiet movies about a simple life in the countryside",
+    "Cyberpunk aesthetics and the blurred line between man and machine",
+    "Psychological thrillers where the protagonist is unreliable",
+    "A movie that captures the feeling of a long, lonely road trip",
+    "Vibrant animation that feels like a living painting",
+    "Stories of unexpected friendship in impossible circumstances",
+    "A movie that feels like a slow-burn fever dream"
+]
@@ -0,0 +1,134 @@
+"""
+Whole-search result cache.
+
+1. Exact tier: the ranked top-k by (normalized query text, Safe Search), in the "results"
+   cache region (TTL + LRU, like the TMDB regions it is built from).
+2. Semantic tier: on an exact miss, the query embedding (which the search needs anyway)
+   is compared with those of the live entries in the same Safe Search mode. At cosine
+   >= LUMINA_SEMANTIC_THRESHOLD (default 0.95; 1 = exact matches only) that ranking is reused.
+3. Prewarmer ranks a fixed list of queries (the Surprise Me prompts) in the background and
+   again before they expire, so those clicks are cache hits.
+"""
+import os
+import re
+import threading
+
+import numpy as np
+
+from cache import region
+from metrics import incr, observe, register_collector
+from warmup import RETRY_SECONDS
+
+SEMANTIC_THRESHOLD = float(os.getenv("LUMINA_SEMANTIC_THRESHOLD", 0.95))
+
+
+def normalize(query):
+    """Case, spacing and punctuation don't change a search."""
+    return " ".join(re.findall(r"\w+", (query or "").lower()))
+
+
+def _unit(vec):
+    vec = np.asarray(vec, dtype=np.float32).ravel()
+    return vec / max(float(np.linalg.norm(vec)), 1e-12)
+
+
+class ResultCache:
+    """Ranked results by (normalized query, safe_search), with a cosine-similarity fallback."""
+
+    def __init__(self, cache_region, threshold=SEMANTIC_THRESHOLD):
+        self.region = cache_region
+        self.threshold = threshold
+        self._vectors = {} # key -> unit query vector, for the entries put with one
+        self._lock = threading.Lock()
+
+    def get(self, query, safe_search, vector_fn=None):
+        """Cached ranking or None. vector_fn() -> query embedding, only called on an exact miss."""
+        key = (normalize(query), bool(safe_search))
+        results = self.region.get(key)
+        if results is not None:
+            incr("result_cache", tier="exact")
+            return results
+
+        if vector_fn is not None and self.threshold < 1:
+            with self._lock:
+                keys = [k for k in self._vectors if k[1] == key[1]]
+                matrix = np.vstack([self._vectors[k] for k in keys]) if keys else None
+            if matrix is not None:
+                sims = matrix @ _unit(vector_fn())
+                for i in np.argsort(-sims):
+                    if sims[i] < self.threshold: break
+                    results = self.region.get(keys[i])
+                    if results is None: # expired / evicted since
+                        with self._lock: self._vectors.pop(keys[i], None)
+                        continue
+                    incr("result_cache", tier="semantic")
+                    observe("result_cache_similarity", float(sims[i]))
+                    return results
+
+        incr("result_cache", tier="miss")
+        return None
+
+    def put(self, query, safe_search, results, vector=None):
+        """Empty rankings are not cached (TMDB down is not an answer worth keeping for an hour)."""
+        if not results: return
+        key = (normalize(query), bool(safe_search))
+        self.region.set(key, tuple(results))
+        if vector is None: return
+        with self._lock:
+            self._vectors[key] = _unit(vector)
+            if len(self._vectors) > self.region.maxsize: # bounded like the region itself
+                live = set(self.region.keys())
+                for stale in [k for k in self._vectors if k not in live]:
+                    del self._vectors[stale]
+
+
+RESULTS = ResultCache(region("results"))
+
+
+class Prewarmer:
+    """
+    Background ranking of a fixed query list: once `after` (a warmup.Resource) is ready,
+    then every `interval` seconds, i.e. shortly before the cached rankings expire.
+    search(query) does the work (and fills the cache).
+    """
+
+    def __init__(self, queries, search, after=None, interval=None):
+        self.queries = list(queries)
+        self.search = search
+        self.after = after
+        self.interval = interval or region("results").ttl * 0.9
+        self.warmed = 0
+        self._stop = threading.Event()
+        self._thread = None
+        register_collector(self._collect)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="query-prewarm", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while self.after is not None and not self._stop.is_set():
+            try:
+                self.after.wait()
+                break
+            except Exception:
+                self._stop.wait(RETRY_SECONDS) # warm-up failed; wait() retries it after its backoff
+        while not self._stop.is_set():
+            self.warmed = 0
+            for query in self.queries:
+                if self._stop.is_set(): return
+                try:
+                    self.search(query)
+                    self.warmed += 1
+                except Exception as e:
+                    print(f"⚠️ Pre-warm failed for '{query}': {e}")
+            print(f"✅ Pre-warmed {self.warmed}/{len(self.queries)} queries.")
+            self._stop.wait(self.interval)
+
+    def _collect(self):
+        yield "prewarmed_queries", {}, self.warmed
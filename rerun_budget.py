@@ -0,0 +1,36 @@
+"""
+Rerun-latency budgets, per interaction type.
+
+app.py tags every full script run and every fragment rerun with what caused it and
+reports the time here: rerun_seconds{interaction=...} plus rerun_over_budget{...}
+when a run blows its budget. The debug panel shows both next to the budget.
+"""
+from metrics import METRICS, incr, observe
+
+# Seconds, server side (script start -> last element sent)
+BUDGETS = {
+    "page": 0.30, # full rerun with nothing new to do (first visit, widget noise)
+    "search": 2.50, # submit / Surprise Me: TMDB fan-out + ranking
+    "safe_search": 0.50, # re-filter + re-rank from cached pages
+    "navigation": 0.30, # Back to Trending
+    "details": 0.15, # one card fragment + its dialog
+    "similar": 0.30, # "More like this": neighbour lookup + grid, no TMDB / model
+    "sidebar": 0.10, # sidebar fragment on its own (debug panel)
+}
+
+
+def record(interaction, seconds):
+    observe("rerun_seconds", seconds, interaction=interaction)
+    if seconds > BUDGETS.get(interaction, BUDGETS["page"]):
+        incr("rerun_over_budget", interaction=interaction)
+
+
+def report():
+    """One row per interaction seen so far: p50 / p95 vs budget (ms) and over-budget runs."""
+    return [
+        {"interaction": h["interaction"], "n": h["count"],
+         "p50": round(h["p50"] * 1000, 1), "p95": round(h["p95"] * 1000, 1),
+         "budget": BUDGETS.get(h["interaction"], BUDGETS["page"]) * 1000,
+         "over": METRICS.counter("rerun_over_budget", interaction=h["interaction"])}
+        for h in METRICS.snapshot()["histograms"] if h["name"] == "rerun_seconds" and "interaction" in h
+    ]
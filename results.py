@@ -0,0 +1,51 @@
+"""
+Compact search results for st.session_state.
+
+A session only keeps what the grid draws: a tuple of slotted Cards (id, score and the
+display fields, with the title / poster strings shared with the process caches). The
+full movie dict lives once per process in the "movies" cache region and is looked up
+by id when something (the details dialog) actually needs it.
+benchmarks/bench_session_memory.py measures the per-session footprint.
+"""
+from cache import region
+
+
+class Card:
+    __slots__ = ("id", "title", "poster", "rating", "year", "score")
+
+    def __init__(self, id, title, poster, rating, year, score=None):
+        self.id = id
+        self.title = title
+        self.poster = poster
+        self.rating = rating
+        self.year = year
+        self.score = score
+
+    @classmethod
+    def from_movie(cls, movie):
+        return cls(
+            movie['id'],
+            movie.get('title', ''),
+            movie.get('poster_path_full'),
+            float(movie.get('vote_average') or 0),
+            (movie.get('release_date') or 'N/A')[:4],
+            movie.get('match_score'),
+        )
+
+    def __repr__(self):
+        return f"Card({self.id}, {self.title!r})"
+
+
+def compact(movies, limit=None):
+    """Ranked movie dicts -> tuple of Cards; full payloads go to the shared store."""
+    movies = movies[:limit] if limit else movies
+    store = region("movies")
+    for movie in movies:
+        store.set(movie['id'], movie)
+    return tuple(Card.from_movie(m) for m in movies)
+
+
+def payload(card_or_id):
+    """Full movie dict behind a card ({} once it has been evicted)."""
+    movie_id = card_or_id.id if isinstance(card_or_id, Card) else card_or_id
+    return region("movies").get(movie_id) or {}
@@ -0,0 +1,161 @@
+"""
+Process-wide scheduler for outbound TMDB traffic.
+1. Token bucket: at most `rate` requests/s (bursts up to `burst`), shared by every session.
+2. Priorities: waiting user-facing calls (direct search, keyword lookups, details) always
+   get the next token before bulk ones (discover pages, Deep History, prefetch).
+3. Retry-After: a 429 pauses *all* traffic for the advertised time, not just one thread.
+4. Coalescing: identical in-flight requests share one call and its result. A caller that
+   joins at a higher priority lifts the shared call (its queued token and any retries) to it.
+"""
+import heapq
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+from metrics import incr, observe, register_collector
+
+PRIORITY_USER = 0
+PRIORITY_BULK = 1
+
+TMDB_RATE = float(os.getenv("TMDB_RATE", 40)) # requests / second
+TMDB_BURST = int(os.getenv("TMDB_BURST", 40))
+ACQUIRE_TIMEOUT = 5.0 # seconds a request may queue before it is given up
+
+
+class RequestScheduler:
+    def __init__(self, rate=TMDB_RATE, burst=TMDB_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._waiting = [] # heap of [priority, seq]
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self._shared = {} # coalesce key -> {"priority", "entry"}: the owner's current ticket
+        self._local = threading.local() # coalesce key the calling thread is running, if any
+        register_collector(self._collect)
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, priority=PRIORITY_BULK, timeout=ACQUIRE_TIMEOUT):
+        """
+        Block until this request may go out. False if it waited longer than timeout.
+        Inside coalesce() it waits at the highest priority of the callers sharing the call.
+        """
+        started = time.monotonic()
+        deadline = started + timeout
+        key = getattr(self._local, "key", None)
+        with self._cond:
+            shared = self._shared.get(key) if key is not None else None
+            if shared is not None: priority = min(priority, shared["priority"])
+            entry = [priority, next(self._seq)]
+            if shared is not None: shared["entry"] = entry
+            heapq.heappush(self._waiting, entry)
+            try:
+                return self._wait_turn(entry, started, deadline)
+            finally:
+                if shared is not None: shared["entry"] = None
+
+    def _wait_turn(self, entry, started, deadline):
+        """acquire() body, called with self._cond held."""
+        while True:
+            now = time.monotonic()
+            self._refill(now)
+            head = self._waiting[0] is entry
+            if head and self._tokens >= 1 and now >= self._paused_until:
+                heapq.heappop(self._waiting)
+                self._tokens -= 1
+                self._cond.notify_all()
+                observe("scheduler_wait_seconds", now - started, priority=entry[0])
+                return True
+            if now >= deadline:
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+                self._cond.notify_all()
+                incr("scheduler_timeouts", priority=entry[0])
+                return False
+            if not head: wait = deadline - now # woken by notify_all when the head moves
+            elif now < self._paused_until: wait = self._paused_until - now
+            else: wait = (1 - self._tokens) / self.rate
+            self._cond.wait(min(wait, deadline - now))
+
+    def pause(self, seconds):
+        """Honour Retry-After: nobody gets a token for `seconds`."""
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._cond.notify_all()
+        incr("scheduler_pauses")
+
+    def coalesce(self, key, fn, priority=PRIORITY_BULK):
+        """
+        Run fn() once per key at a time; concurrent callers with the same key share its result.
+        fn's acquire() calls (on this thread) wait at the best priority among the callers.
+        """
+        with self._inflight_lock:
+            shared = self._inflight.get(key)
+            if shared is None:
+                shared = self._inflight[key] = Future()
+                with self._cond:
+                    self._shared[key] = {"priority": priority, "entry": None}
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            incr("scheduler_coalesced")
+            self._boost(key, priority)
+            return shared.result()
+
+        outer = getattr(self._local, "key", None)
+        self._local.key = key
+        try:
+            result = fn()
+            shared.set_result(result)
+            return result
+        except BaseException as e:
+            shared.set_exception(e)
+            raise
+        finally:
+            self._local.key = outer
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+                with self._cond:
+                    self._shared.pop(key, None)
+
+    def _boost(self, key, priority):
+        """A caller joined key's call at `priority`: move the owner's ticket up if that's better."""
+        with self._cond:
+            shared = self._shared.get(key)
+            if shared is None or shared["priority"] <= priority: return
+            shared["priority"] = priority
+            entry = shared["entry"]
+            if entry is not None:
+                entry[0] = priority
+                heapq.heapify(self._waiting)
+                self._cond.notify_all()
+        incr("scheduler_boosts")
+
+    def _collect(self):
+        with self._cond:
+            queued = len(self._waiting)
+        yield "scheduler_queued", {}, queued
+        yield "scheduler_inflight", {}, len(self._inflight)
+
+
+def parse_retry_after(value, default=1.0):
+    """Retry-After is either delta-seconds or an HTTP date; we only need seconds."""
+    if not value: return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        from email.utils import parsedate_to_datetime
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return default
@@ -0,0 +1,342 @@
+"""
+Per-host encoder / index sidecar for multi-worker deployments.
+
+Every Streamlit server process used to load its own SentenceTransformer (and build its
+own index over the embeddings). With LUMINA_SIDECAR pointing at a Unix socket, the
+workers on a host share one process that does both:
+
+    python sidecar.py --socket /tmp/lumina-sidecar.sock
+    LUMINA_SIDECAR=/tmp/lumina-sidecar.sock streamlit run app.py --server.port 8501
+
+1. The sidecar answers batched encode and top-k search requests. Encodes from all
+   workers go through its EncodeQueue, so they batch together.
+2. core.load_model / ContentEngine switch to RemoteEncoder / RemoteIndex when the socket
+   answers at startup (otherwise they stay in-process, exactly like before).
+3. A call that fails falls back to in-process inference (loaded on first use) and the
+   sidecar is retried after RETRY_SECONDS.
+benchmarks/bench_sidecar.py compares memory and throughput for N workers.
+
+Wire format (both directions): 4-byte big-endian header length, JSON header, then the
+raw bytes of the arrays the header lists as [dtype, shape].
+"""
+import argparse
+import json
+import os
+import resource
+import socket
+import socketserver
+import struct
+import threading
+import time
+import uuid
+
+import numpy as np
+
+from metrics import incr, observe
+
+SIDECAR_SOCKET = os.getenv("LUMINA_SIDECAR")
+SIDECAR_TIMEOUT = float(os.getenv("LUMINA_SIDECAR_TIMEOUT", 30))
+DEFAULT_SOCKET = "/tmp/lumina-sidecar.sock"
+RETRY_SECONDS = 30
+
+
+class SidecarUnavailable(ConnectionError):
+    """The socket is down (or was, less than RETRY_SECONDS ago): use the in-process path."""
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process (ru_maxrss is KiB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# --- WIRE FORMAT ---
+def _recv_exact(sock, n):
+    buf = bytearray(n)
+    view = memoryview(buf)
+    got = 0
+    while got < n:
+        chunk = sock.recv_into(view[got:])
+        if not chunk: raise ConnectionError("connection closed")
+        got += chunk
+    return buf
+
+
+def send_message(sock, header, arrays=()):
+    arrays = [np.ascontiguousarray(a) for a in arrays]
+    head = json.dumps({**header, "arrays": [[a.dtype.str, list(a.shape)] for a in arrays]}).encode()
+    sock.sendall(struct.pack(">I", len(head)) + head)
+    for a in arrays:
+        if a.size: sock.sendall(memoryview(a).cast("B"))
+
+
+def recv_message(sock):
+    (size,) = struct.unpack(">I", _recv_exact(sock, 4))
+    header = json.loads(_recv_exact(sock, size))
+    arrays = []
+    for dtype, shape in header.pop("arrays", []):
+        dtype = np.dtype(dtype)
+        nbytes = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+        arrays.append(np.frombuffer(_recv_exact(sock, nbytes), dtype=dtype).reshape(shape))
+    return header, arrays
+
+
+# --- CLIENT ---
+class SidecarClient:
+    """One connection per calling thread; a failed call marks the sidecar down for RETRY_SECONDS."""
+
+    def __init__(self, path, timeout=SIDECAR_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._down_until = 0.0
+        self._healthy = False
+
+    def _sock(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.path)
+            except OSError:
+                sock.close()
+                raise
+            self._local.sock = sock
+        return sock
+
+    def _drop(self):
+        sock = getattr(self._local, "sock", None)
+        self._local.sock = None
+        if sock is not None: sock.close()
+
+    def call(self, op, arrays=(), **fields):
+        """(header, arrays) reply. Raises SidecarUnavailable, or RuntimeError for a failed request."""
+        if time.monotonic() < self._down_until:
+            raise SidecarUnavailable(f"sidecar at {self.path} is down")
+        started = time.perf_counter()
+        try:
+            sock = self._sock()
+            send_message(sock, {**fields, "op": op}, arrays)
+            header, out = recv_message(sock)
+        except (OSError, ValueError) as e: # ValueError: torn / garbled reply
+            self._drop()
+            if self._healthy:
+                print(f"⚠️ Sidecar {self.path} unavailable ({e}), using in-process inference for {RETRY_SECONDS}s.")
+            self._healthy = False
+            self._down_until = time.monotonic() + RETRY_SECONDS
+            incr("sidecar_errors", op=op)
+            raise SidecarUnavailable(str(e)) from e
+        self._healthy = True
+        observe("sidecar_seconds", time.perf_counter() - started, op=op)
+        if "error" in header:
+            raise RuntimeError(f"sidecar {op} failed: {header['error']}")
+        return header, out
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def connect(path=SIDECAR_SOCKET):
+    """Shared client for path if the sidecar answers now, else None (stay in-process)."""
+    if not path: return None
+    with _clients_lock:
+        client = _clients.get(path)
+        if client is None:
+            client = SidecarClient(path)
+            try:
+                client.call("ping")
+            except SidecarUnavailable as e:
+                print(f"⚠️ No sidecar at {path} ({e}), running in-process.")
+                return None
+            print(f"✅ Using the sidecar at {path}.")
+            _clients[path] = client
+        return client
+
+
+class _Fallback:
+    """Lazily loaded in-process twin of a remote resource."""
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._value = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._value is None:
+                self._value = self._loader()
+        return self._value
+
+
+class RemoteEncoder:
+    """Encoder on the sidecar. The in-process encoder is only loaded if the sidecar goes away."""
+
+    def __init__(self, client, fallback_loader):
+        self.client = client
+        self.fallback = _Fallback(fallback_loader)
+        header, _ = client.call("info")
+        if header.get("cache_name"):
+            self.cache_name = header["cache_name"]
+
+    def encode(self, texts):
+        texts = list(texts)
+        try:
+            return self.client.call("encode", texts=texts)[1][0]
+        except SidecarUnavailable:
+            incr("sidecar_fallbacks", op="encode")
+            return self.fallback.get().encode(texts)
+
+
+class RemoteIndex:
+    """
+    The sidecar's vector index, same contract as VectorIndex / EmbeddingStore.
+    Rows refer to the sidecar's id list, fetched once and again whenever it restarts.
+    """
+    kind = "sidecar"
+    neighbours = None
+
+    def __init__(self, client, fallback_loader):
+        self.client = client
+        self.fallback = _Fallback(fallback_loader)
+        self._load_ids()
+
+    def _load_ids(self):
+        header, (ids,) = self.client.call("ids")
+        self._rows = {int(i): r for r, i in enumerate(ids)}
+        self.ids = ids
+        self.catalog = header["catalog"]
+
+    def _check(self, header):
+        if header["catalog"] != self.catalog: self._load_ids()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def row_of(self, movie_id):
+        return self._rows.get(int(movie_id))
+
+    def dense(self, rows):
+        ids = np.asarray(self.ids[rows], dtype=np.int64)
+        try:
+            return self.client.call("dense", [ids])[1][0]
+        except SidecarUnavailable:
+            incr("sidecar_fallbacks", op="dense")
+            local = self.fallback.get()
+            return local.dense([local.row_of(i) for i in ids])
+
+    def search(self, query_vecs, k=50):
+        q = np.asarray(query_vecs, dtype=np.float32)
+        if q.ndim == 1: q = q[None, :]
+        try:
+            header, (rows, scores) = self.client.call("search", [q], k=k)
+            self._check(header)
+            return rows, scores
+        except SidecarUnavailable:
+            incr("sidecar_fallbacks", op="search")
+            return self._local_search(q, k)
+
+    def _local_search(self, q, k):
+        """Fallback search, mapped back to our rows (drops ids the sidecar's catalog lacks)."""
+        local = self.fallback.get()
+        rows, scores = local.search(q, k)
+        mapped = np.array([[self._rows.get(int(i), -1) for i in local.ids[line]] for line in rows], dtype=np.int64).reshape(rows.shape)
+        keep = mapped >= 0
+        if keep.all(): return mapped, scores
+        width = int(keep.sum(axis=1).min())
+        return (np.array([m[kp][:width] for m, kp in zip(mapped, keep)]).reshape(len(q), width),
+                np.array([s[kp][:width] for s, kp in zip(scores, keep)]).reshape(len(q), width))
+
+
+# --- SERVER ---
+class Sidecar:
+    """The serving side: one encoder (behind an EncodeQueue) and one index for the host."""
+
+    def __init__(self, encoder, index):
+        self.encoder = encoder
+        self.index = index
+        self.catalog = uuid.uuid4().hex # rows are only stable for one server lifetime
+
+    def dispatch(self, header, arrays):
+        op = header.get("op")
+        if op == "ping":
+            return {}, ()
+        if op == "info":
+            info = {"kind": self.index.kind, "count": len(self.index), "catalog": self.catalog, "rss_mb": peak_rss_mb()}
+            if getattr(self.encoder, "cache_name", None):
+                info["cache_name"] = self.encoder.cache_name
+            return info, ()
+        if op == "encode":
+            return {}, [np.asarray(self.encoder.encode(header["texts"]), dtype=np.float32)]
+        if op == "ids":
+            return {"catalog": self.catalog}, [np.asarray(self.index.ids, dtype=np.int64)]
+        if op == "search":
+            rows, scores = self.index.search(arrays[0], int(header.get("k", 50)))
+            return {"catalog": self.catalog}, [np.asarray(rows, dtype=np.int64), np.asarray(scores, dtype=np.float32)]
+        if op == "dense":
+            rows = [self.index.row_of(i) for i in arrays[0]]
+            if any(r is None for r in rows): raise KeyError("unknown movie id")
+            return {}, [np.asarray(self.index.dense(rows), dtype=np.float32)]
+        raise ValueError(f"unknown op {op!r}")
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                header, arrays = recv_message(self.request)
+            except (OSError, ValueError, struct.error):
+                return # client went away (or sent garbage)
+            try:
+                reply, out = self.server.sidecar.dispatch(header, arrays)
+            except Exception as e:
+                reply, out = {"error": f"{type(e).__name__}: {e}"}, ()
+            send_message(self.request, reply, out)
+
+
+def serve(path, encoder, index):
+    """Serve until interrupted. A stale socket file is replaced, a live one is not."""
+    if os.path.exists(path):
+        probe = SidecarClient(path, timeout=1)
+        try:
+            probe.call("ping")
+            raise SystemExit(f"🚨 A sidecar is already listening on {path}")
+        except SidecarUnavailable:
+            os.unlink(path)
+
+    server = socketserver.ThreadingUnixStreamServer(path, _Handler)
+    server.daemon_threads = True
+    server.sidecar = Sidecar(encoder, index)
+    os.chmod(path, 0o600) # same-user workers only
+    print(f"✅ Sidecar listening on {path} ({len(index)} vectors, {index.kind} index, {peak_rss_mb():.0f} MB)")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(path): os.unlink(path)
+
+
+def main():
+    import core
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default=SIDECAR_SOCKET or DEFAULT_SOCKET)
+    parser.add_argument("--backend", default=None, help="encoder backend (default: LUMINA_ENCODER or torch)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    try:
+        movies_df, embeddings = core.load_data()
+    except core.DataFileMissing as e:
+        raise SystemExit(f"🚨 {e} {e.hint}")
+    index = core.local_index(embeddings, movies_df)
+    encoder = core.load_model(backend=args.backend, sidecar=None) # never a client of itself
+    print(f"✅ Sidecar ready in {time.perf_counter() - started:.1f}s")
+    try:
+        serve(args.socket, encoder, index)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import os
+
+import numpy as np
+
+from embedding_store import EmbeddingStore, write_store
+
+
+def _legacy_store(path, ids, matrix):
+    """A plain store directory, the layout from before versioned stores."""
+    write_store(path, ids, matrix, "test-model")
+    version = os.path.realpath(path)
+    os.remove(path)
+    os.replace(version, path)
+
+
+def test_legacy_migration_keeps_open_readers(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = "movie_embeddings" # relative, like DEFAULT_STORE_DIR
+    rng = np.random.default_rng(0)
+    old = rng.standard_normal((8, 4)).astype(np.float32)
+    _legacy_store(path, np.arange(8), old)
+    reader = EmbeddingStore(path)
+    before = reader.dense(np.arange(8))
+
+    write_store(path, np.arange(8, 16), rng.standard_normal((8, 4)).astype(np.float32), "test-model")
+
+    assert os.path.islink(path)
+    assert os.path.exists(os.path.join(f"{path}.v-legacy", "header.json"))
+    np.testing.assert_array_equal(reader.dense(np.arange(8)), before)
+    assert EmbeddingStore(f"{path}.v-legacy").ids.tolist() == list(range(8))
+    assert EmbeddingStore(path).ids.tolist() == list(range(8, 16))
+
+
+def test_second_swap_removes_legacy(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = "movie_embeddings"
+    matrix = np.eye(4, dtype=np.float32)
+    _legacy_store(path, np.arange(4), matrix)
+    write_store(path, np.arange(4), matrix, "test-model")
+    write_store(path, np.arange(4), matrix, "test-model")
+
+    assert not os.path.exists(f"{path}.v-legacy")
+    assert len([n for n in os.listdir(tmp_path) if n.startswith("movie_embeddings.v-")]) == 2
@@ -1,127 +1,314 @@
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
-import streamlit as st
 import os
 import re
+import time
+import threading
+import heapq
+import itertools
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from cache import region
+from http_cache import DEFAULT_PATH as HTTP_CACHE_PATH, HttpCache, cache_key
+from metrics import incr, observe, register_collector, span
+from scheduler import PRIORITY_BULK, PRIORITY_USER, RequestScheduler, parse_retry_after
 
 # Constants
-TMDB_API_BASE_URL = "https://api.themoviedb.org/3"
+TMDB_API_BASE_URL = os.getenv("TMDB_API_BASE_URL", "https://api.themoviedb.org/3") # overridable for the benchmark stub
 BASE_IMAGE_URL = "https://image.tmdb.org/t/p/w500/"
 BASE_BACKDROP_URL = "https://image.tmdb.org/t/p/w1280/"
 
+# Fan-out
+FANOUT_WORKERS = 16
+SEARCH_DEADLINE = 4.0 # seconds, whole fetch_smart_candidates
+REQUEST_TIMEOUT = (3.05, 4) # (connect, read) per request
+CLASSICS_PAGES = range(1, 6)
+_SOURCE_ORDER = {"search": 0, "discover": 1, "history": 2}
+_FANOUT_POOL = ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix="tmdb-fanout")
+
+# Details prefetch (kept small: it competes with user-facing searches)
+DETAILS_WORKERS = 4
+_DETAILS_POOL = ThreadPoolExecutor(max_workers=DETAILS_WORKERS, thread_name_prefix="tmdb-details")
+_prefetching = set()
+_prefetch_queue = [] # (priority, seq, movie_id, api_key): workers take the most urgent id first
+_prefetch_seq = itertools.count()
+_prefetch_lock = threading.Lock()
+
+# Persistent response cache (disk, shared by worker processes); "" disables it
+_http_cache = HttpCache(os.getenv("TMDB_CACHE_PATH", HTTP_CACHE_PATH))
+REVALIDATE_WORKERS = 2
+_REVALIDATE_POOL = ThreadPoolExecutor(max_workers=REVALIDATE_WORKERS, thread_name_prefix="tmdb-revalidate")
+
+# One token bucket for every TMDB call in the process (TMDB_RATE / TMDB_BURST)
+_scheduler = RequestScheduler()
+
+# Shared HTTP client: one keep-alive connection per thread that can call TMDB at once
+POOL_MAXSIZE = int(os.getenv("TMDB_POOL_MAXSIZE", FANOUT_WORKERS + DETAILS_WORKERS + REVALIDATE_WORKERS))
+RETRY_STATUSES = [429, 500, 502, 503, 504]
+_session = None
+_session_lock = threading.Lock()
+
+class _CountingRetry(Retry):
+    """
+    urllib3 Retry that reports every retry (429 / 5xx / connection errors).
+    A 429 also pauses the shared scheduler for Retry-After, so the other threads back off too,
+    and every retry waits for its own scheduler token, like the first attempt.
+    """
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        reason = str(response.status) if response is not None else type(error).__name__
+        incr("tmdb_retries", reason=reason)
+        if response is not None and response.status == 429:
+            _scheduler.pause(parse_retry_after(response.headers.get("Retry-After")))
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+    def sleep(self, response=None):
+        super().sleep(response)
+        # Bulk unless we're inside tmdb_get_json's coalesce, which lifts it to the caller's priority
+        if not _scheduler.acquire(PRIORITY_BULK):
+            raise TimeoutError("no TMDB scheduler token for the retry")
+
+class _TrackedSession(requests.Session):
+    """Session that times every call by TMDB endpoint (ids collapsed to {id})."""
+
+    def request(self, method, url, *args, **kwargs):
+        endpoint = _endpoint(url)
+        started = time.perf_counter()
+        ok = False
+        try:
+            resp = super().request(method, url, *args, **kwargs)
+            ok = resp.status_code in (200, 304)
+            return resp
+        finally:
+            observe("tmdb_request_seconds", time.perf_counter() - started, endpoint=endpoint)
+            if not ok: incr("tmdb_errors", endpoint=endpoint)
+
+def _endpoint(url):
+    """'/movie/603?x=1' style URL -> '/movie/{id}' (metrics + cache TTL key)."""
+    return re.sub(r"/\d+", "/{id}", url.replace(TMDB_API_BASE_URL, "").split("?")[0])
+
+def tmdb_get_json(session, url, params, priority=PRIORITY_BULK):
+    """
+    GET through the persistent response cache -> parsed JSON, or None on failure.
+    Network calls wait for a scheduler token at `priority`; identical concurrent calls
+    (same URL + params) are coalesced into one.
+    """
+    return _scheduler.coalesce(cache_key(url, params), lambda: _http_cache.get_json(
+        session, url, params, _endpoint(url), timeout=REQUEST_TIMEOUT, executor=_REVALIDATE_POOL,
+        gate=lambda: _scheduler.acquire(priority),
+        background_gate=lambda: _scheduler.acquire(PRIORITY_BULK),
+    ), priority)
+
 def get_session():
-    """Create a robust requests session with retries."""
-    session = requests.Session()
-    retry = Retry(connect=3, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504])
-    adapter = HTTPAdapter(max_retries=retry)
-    session.mount('http://', adapter)
-    session.mount('https://', adapter)
-    session.headers.update({
-        "User-Agent": "Lumina-Desktop-App/1.0",
-        "Accept": "application/json"
-    })
-    return session
-
-@st.cache_data(ttl=3600)
+    """
+    Shared keep-alive session for every TMDB call (thread-safe, built once per process).
+    Retries 429 / 5xx with backoff and honours Retry-After.
+    """
+    global _session
+    if _session is not None: return _session
+    with _session_lock:
+        if _session is None:
+            session = _TrackedSession()
+            retry = _CountingRetry(
+                total=3, connect=3, backoff_factor=0.5,
+                status_forcelist=RETRY_STATUSES, allowed_methods=["GET"],
+                respect_retry_after_header=True, raise_on_status=False
+            )
+            adapter = HTTPAdapter(max_retries=retry, pool_connections=4, pool_maxsize=POOL_MAXSIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update({
+                "User-Agent": "Lumina-Desktop-App/1.0",
+                "Accept": "application/json"
+            })
+            _session = session
+    return _session
+
+def _connection_counts():
+    connections = requests_sent = 0
+    if _session is not None:
+        for adapter in _session.adapters.values():
+            for key in list(adapter.poolmanager.pools.keys()):
+                pool = adapter.poolmanager.pools.get(key)
+                if pool is None: continue
+                connections += pool.num_connections
+                requests_sent += pool.num_requests
+    return connections, requests_sent
+
+def _collect_connections():
+    connections, requests_sent = _connection_counts()
+    reuse = round(1 - connections / requests_sent, 3) if requests_sent else 0.0
+    return [("tmdb_connections_opened", {}, connections), ("tmdb_connection_reuse", {}, reuse)]
+
+register_collector(_collect_connections)
+
 def fetch_trending(api_key, safe_search=True):
-    """Fetch global trending movies."""
+    """Fetch global trending movies (raw list cached, Safe Search applied after)."""
     if not api_key: return []
-    session = get_session()
-    try:
-        url = f"{TMDB_API_BASE_URL}/trending/movie/day"
-        # DOUBLE WALL: API DEFENSE
-        params = {"api_key": api_key, "language": "en-US", "include_adult": "false"}
-        resp = session.get(url, params=params)
-        if resp.status_code == 200:
-            return _process_results(resp.json().get('results', []), safe_search)
-    except: pass
-    return []
+    url = f"{TMDB_API_BASE_URL}/trending/movie/day"
+    # DOUBLE WALL: API DEFENSE
+    params = {"api_key": api_key, "language": "en-US", "include_adult": "false"}
+    raw = region("trending").get_or_set("day", lambda: _get_results(get_session(), url, params, PRIORITY_USER))
+    return _process_results(raw or [], safe_search)
+
+def classics_params(api_key, page):
+    """Deep History query: the most-voted films on TMDB (barely changes day to day)."""
+    return {
+        "api_key": api_key,
+        "language": "en-US",
+        "sort_by": "vote_count.desc",
+        "vote_count.gte": "1000",
+        "include_adult": "false", # DOUBLE WALL
+        "page": page
+    }
 
-@st.cache_data(ttl=3600) 
-def fetch_smart_candidates(api_key, safe_search, query=None):
+def fetch_smart_candidates(api_key, safe_search, query=None, deadline=SEARCH_DEADLINE, include_history=True):
     """
-    V1.2 Final: High-Recall Multi-Fetch without Genres.
+    V1.3: High-Recall Multi-Fetch, concurrent.
+    All independent calls run at once on a shared pool; keyword discover pages start
+    as soon as the keyword ids arrive. Anything still running at `deadline` seconds is dropped.
+    Direct search and keyword lookups go out at user priority, discover / history pages as bulk.
+    Every sub-request is cached raw in its own region, and Safe Search is applied last,
+    so toggling it never touches the network.
+    include_history=False skips the Deep History pages (served by ClassicsPool instead).
     """
     if not api_key: return []
+    # Merge is deterministic: direct search -> keyword discover -> deep history
+    results = {(source, order): data for source, order, data in _iter_sources(api_key, query, deadline, include_history)}
+
+    # Deduplicate (first source wins)
+    candidates = {}
+    for key in sorted(results, key=lambda k: (_SOURCE_ORDER[k[0]], k[1])):
+        for m in results[key]:
+            if m['id'] not in candidates:
+                candidates[m['id']] = m
+
+    # Filter & Process
+    final_candidates = list(candidates.values())
+    return _process_results(final_candidates, safe_search)
+
+def stream_smart_candidates(api_key, safe_search, query=None, deadline=SEARCH_DEADLINE, include_history=True, priority=PRIORITY_USER):
+    """
+    Streaming fetch_smart_candidates: yields (source, movies) as each TMDB call lands
+    (cached ones first), Safe Search applied. Same requests, same deadline.
+    Ids can repeat across batches; core.IncrementalRanker dedupes them.
+    priority applies to the search / keyword calls (PRIORITY_BULK for background pre-warming).
+    """
+    if not api_key: return
+    for source, _, data in _iter_sources(api_key, query, deadline, include_history, priority):
+        yield source, _process_results(data, safe_search)
+
+def _iter_sources(api_key, query, deadline, include_history, priority=PRIORITY_USER):
+    """
+    The fan-out itself: yields (source, order, raw results) as each call completes
+    (region hits immediately, failed calls as []). Keyword lookups are consumed here.
+    """
     session = get_session()
-    candidates = {} # Deduplication Dict
+    started = time.monotonic()
 
-    # 1. FETCH 1: DIRECT SEARCH
-    if query and query.strip():
-        try:
-            url = f"{TMDB_API_BASE_URL}/search/movie"
-            # DOUBLE WALL: API DEFENSE
-            params = {"api_key": api_key, "query": query, "include_adult": "false", "region": "US", "page": 1}
-            resp = session.get(url, params=params)
-            if resp.status_code == 200:
-                for m in resp.json().get('results', []):
-                    candidates[m['id']] = m
-        except: pass
-
-        # 2. FETCH 2: KEYWORD DISCOVERY
-        try:
-            words = query.lower().split()
-            useful_words = [w for w in words if len(w) > 3]
-            keyword_ids = []
-            
-            for w in useful_words:
-                try:
-                    k_url = f"{TMDB_API_BASE_URL}/search/keyword"
-                    k_resp = session.get(k_url, params={"api_key": api_key, "query": w})
-                    if k_resp.status_code == 200:
-                        k_data = k_resp.json().get('results', [])
-                        if k_data:
-                            # Take top 2 keyword IDs per word
-                            keyword_ids.extend([str(x['id']) for x in k_data[:2]])
-                except: pass
-            
-            if keyword_ids:
-                keywords_pipe = "|".join(keyword_ids[:10])
-                disc_url = f"{TMDB_API_BASE_URL}/discover/movie"
-                disc_params = {
+    search_url = f"{TMDB_API_BASE_URL}/search/movie"
+    keyword_url = f"{TMDB_API_BASE_URL}/search/keyword"
+    discover_url = f"{TMDB_API_BASE_URL}/discover/movie"
+
+    # Each future maps to (source, order) so callers can merge deterministically
+    pending = {}
+    ready = []
+    keyword_slots = {}
+
+    def submit(source, order, url, params, cache_region, cache_key, priority=PRIORITY_BULK):
+        cached = region(cache_region).get(cache_key)
+        if cached is not None:
+            on_result(source, order, cached)
+            return
+        fut = _FANOUT_POOL.submit(_get_results, session, url, params, priority)
+        pending[fut] = (source, order, cache_region, cache_key)
+
+    def on_result(source, order, data):
+        if source != "keyword":
+            ready.append((source, order, data))
+            return
+
+        # Take top 2 keyword IDs per word
+        keyword_slots[order] = [str(x['id']) for x in data[:2]]
+        if any(v is None for v in keyword_slots.values()): return
+
+        # All lookups in -> fire the keyword discover pages right away
+        keyword_ids = [k for i in sorted(keyword_slots) for k in keyword_slots[i]]
+        if keyword_ids:
+            keywords_pipe = "|".join(keyword_ids[:10])
+            for p in range(1, 4): # 3 pages for better recall
+                submit("discover", p, discover_url, {
                     "api_key": api_key, 
                     "with_keywords": keywords_pipe,
                     "language": "en-US",
                     "sort_by": "popularity.desc",
                     "include_adult": "false", # DOUBLE WALL
-                    "page": 1
-                }
-                # Fetch 2 pages of keyword matches
-                for p in range(1, 4): # Bumped to 3 pages for better recall
-                    disc_params['page'] = p
-                    d_resp = session.get(disc_url, params=disc_params)
-                    if d_resp.status_code == 200:
-                        for m in d_resp.json().get('results', []):
-                            if m['id'] not in candidates:
-                                candidates[m['id']] = m
-        except: pass
+                    "page": p
+                }, "discover", (keywords_pipe, p))
+
+    if query and query.strip():
+        # 1. FETCH 1: DIRECT SEARCH
+        # DOUBLE WALL: API DEFENSE
+        submit("search", 0, search_url, {"api_key": api_key, "query": query, "include_adult": "false", "region": "US", "page": 1}, "search", query, priority)
+
+        # 2. FETCH 2: KEYWORD LOOKUPS (one per long word)
+        useful_words = [w for w in query.lower().split() if len(w) > 3]
+        keyword_slots = {i: None for i in range(len(useful_words))}
+        for i, w in enumerate(useful_words):
+            submit("keyword", i, keyword_url, {"api_key": api_key, "query": w}, "keywords", w, priority)
 
     # 3. FETCH 3: DEEP HISTORY (The "Classics" Pool)
-    dh_url = f"{TMDB_API_BASE_URL}/discover/movie"
-    dh_params = {
-        "api_key": api_key,
-        "language": "en-US",
-        "sort_by": "vote_count.desc",
-        "vote_count.gte": "1000",
-        "include_adult": "false" # DOUBLE WALL
-    }
-    
-    for p in range(1, 6): # 5 Pages -> 100 Movies
-        dh_params['page'] = p
-        try:
-            dh_resp = session.get(dh_url, params=dh_params)
-            if dh_resp.status_code == 200:
-                for m in dh_resp.json().get('results', []):
-                    if m['id'] not in candidates:
-                        candidates[m['id']] = m
-        except: pass
+    if include_history:
+        for p in CLASSICS_PAGES: # 5 Pages -> 100 Movies
+            submit("history", p, discover_url, classics_params(api_key, p), "classics", p)
 
-    # Filter & Process
-    final_candidates = list(candidates.values())
-    return _process_results(final_candidates, safe_search)
+    holes = []
+    try:
+        while ready: yield ready.pop(0)
+        while pending:
+            remaining = deadline - (time.monotonic() - started)
+            if remaining <= 0: break
+            done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for fut in done:
+                source, order, cache_region, cache_key = pending.pop(fut)
+                data = fut.result()
+                if data is None:
+                    data = [] # failed call: don't cache, just contribute nothing
+                    holes.append(source)
+                else:
+                    region(cache_region).set(cache_key, data)
+                on_result(source, order, data)
+            while ready: yield ready.pop(0)
+    finally:
+        # Late pages are dropped, never waited on (also when the consumer stops early)
+        for fut in pending:
+            fut.cancel()
+        if pending:
+            incr("tmdb_dropped", len(pending))
+            print(f"⏱️ Search deadline hit, dropped {len(pending)} TMDB request(s).")
+        # Failed sources used to vanish silently; count them so recall gaps show up in metrics
+        for source in holes:
+            incr("recall_holes", source=source)
+        if holes:
+            print(f"⚠️ {len(holes)} TMDB source(s) failed for this search: {', '.join(sorted(set(holes)))}")
+
+def _get_results(session, url, params, priority=PRIORITY_BULK):
+    """One TMDB list call -> 'results' (None on any failure, so it is never cached)."""
+    try:
+        data = tmdb_get_json(session, url, params, priority)
+        if data is not None:
+            return data.get('results', [])
+    except Exception as e:
+        incr("tmdb_failures", endpoint=_endpoint(url))
+        print(f"⚠️ TMDB call failed ({_endpoint(url)}): {e}")
+    return None
 
 def _process_results(candidates, safe_search=True):
+    with span("safe_search_filter"):
+        return _filter_results(candidates, safe_search)
+
+def _filter_results(candidates, safe_search):
     final_results = []
     
     # NUCLEAR BLACKLIST (V1.6 Expanded)
@@ -149,47 +336,85 @@ def _process_results(candidates, safe_search=True):
             if any(word in text_to_scan for word in blacklist):
                 continue
 
+        # Copy: the input dicts live in the shared cache regions
+        movie = dict(movie)
         movie['poster_path_full'] = f"{BASE_IMAGE_URL}{movie['poster_path']}" if movie.get('poster_path') else None
         movie['backdrop_path_full'] = f"{BASE_BACKDROP_URL}{movie['backdrop_path']}" if movie.get('backdrop_path') else None
         final_results.append(movie)
     return final_results
 
-@st.cache_data(ttl=3600)
-def fetch_extended_details(movie_id, api_key):
-    """Fetch Credits and Certification."""
+def fetch_extended_details(movie_id, api_key, priority=PRIORITY_USER):
+    """Fetch Credits + display fields (cached per movie in the 'details' region)."""
+    return region("details").get_or_set(movie_id, lambda: _load_details(movie_id, api_key, priority))
+
+def cached_poster(movie_id):
+    """Poster URL from the details cache, if its details were already fetched (never blocks)."""
+    return (region("details").get(movie_id) or {}).get('poster_path_full')
+
+def fill_posters(movies, api_key, priority=PRIORITY_USER):
+    """
+    Local catalog rows (tmdb_5000 CSV) carry no poster. Never blocks: posters already in
+    the details cache are copied in, the rest are queued on the details pool at `priority`
+    and the card shows a placeholder until they land (cached_poster / details_pending).
+    """
+    missing = [m['id'] for m in movies if not m.get('poster_path_full')]
+    if not missing: return movies
+    posters = {movie_id: poster for movie_id in missing if (poster := cached_poster(movie_id))}
+    observe("poster_fill", len(posters) / len(missing))
+    prefetch_details([movie_id for movie_id in missing if movie_id not in posters], api_key, priority)
+    return [{**m, 'poster_path_full': posters[m['id']]} if m['id'] in posters else m for m in movies]
+
+def details_pending(movie_id):
+    """True while a background details fetch for the movie is queued or running."""
+    with _prefetch_lock:
+        return movie_id in _prefetching
+
+def prefetch_details(movie_ids, api_key, priority=PRIORITY_BULK):
+    """
+    Warm the details cache in the background. Bounded by DETAILS_WORKERS process-wide;
+    cached or already queued ids are skipped, and a free worker always takes the most
+    urgent queued id, so Prewarmer (BULK) work never holds up a user's posters.
+    """
+    if not api_key: return
+    details = region("details")
+    for movie_id in movie_ids:
+        with _prefetch_lock:
+            if movie_id in _prefetching or details.get(movie_id) is not None: continue
+            _prefetching.add(movie_id)
+            heapq.heappush(_prefetch_queue, (priority, next(_prefetch_seq), movie_id, api_key))
+        _DETAILS_POOL.submit(_prefetch_next) # one task per queued id
+
+def _prefetch_next():
+    with _prefetch_lock:
+        priority, _, movie_id, api_key = heapq.heappop(_prefetch_queue)
+    try:
+        fetch_extended_details(movie_id, api_key, priority)
+    finally:
+        with _prefetch_lock:
+            _prefetching.discard(movie_id)
+
+def _load_details(movie_id, api_key, priority=PRIORITY_USER):
     session = get_session()
     url = f"{TMDB_API_BASE_URL}/movie/{movie_id}"
-    params = {"api_key": api_key, "append_to_response": "credits,release_dates"}
+    params = {"api_key": api_key, "append_to_response": "credits"}
     
     try:
-        r = session.get(url, params=params)
-        if r.status_code == 200:
-            data = r.json()
-            cert = "NR"
-            release_dates = data.get('release_dates', {}).get('results', [])
-            for region in ["IN", "US"]:
-                rel_data = next((item for item in release_dates if item["iso_3166_1"] == region), None)
-                if rel_data:
-                    for rel in rel_data['release_dates']:
-                        if rel.get('certification'):
-                            cert = rel['certification']
-                            break
-                if cert != "NR": break
-            
-            cast = [p['name'] for p in data.get('credits', {}).get('cast', [])[:5]]
-            crew = data.get('credits', {}).get('crew', [])
-            directors = [p['name'] for p in crew if p['job'] == 'Director']
-            
-            return {
-                "certification": cert,
-                "cast": cast,
-                "directors": directors,
-                "runtime": data.get('runtime', 0),
-                "title": data.get('title', ''),
-                "tagline": data.get('tagline', ''),
-                "overview": data.get('overview', ''),
-                "vote_average": data.get('vote_average', 0),
-                "imdb_id": data.get('imdb_id', '')
-            }
-    except Exception: return None
+        data = tmdb_get_json(session, url, params, priority)
+        if data is not None:
+            return _extract_details(data)
+    except Exception as e:
+        incr("tmdb_failures", endpoint="/movie/{id}")
+        print(f"⚠️ Details fetch failed for {movie_id}: {e}")
     return None
+
+def _extract_details(data):
+    """Only what the details dialog renders; the full credits payload is dropped here."""
+    return {
+        "title": data.get('title', ''),
+        "tagline": data.get('tagline', ''),
+        "overview": data.get('overview', ''),
+        "vote_average": data.get('vote_average', 0),
+        "runtime": data.get('runtime', 0),
+        "cast": [p['name'] for p in data.get('credits', {}).get('cast', [])[:5]],
+        "poster_path_full": f"{BASE_IMAGE_URL}{data['poster_path']}" if data.get('poster_path') else None,
+    }
@@ -0,0 +1,157 @@
+import json
+
+import numpy as np
+
+# Above this many rows the approximate index pays for itself
+APPROX_THRESHOLD = 50000
+
+
+def _normalize(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1: matrix = matrix[None, :]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class VectorIndex:
+    """
+    Exact cosine index.
+    Rows are L2-normalized once, so a search is a single float32 matmul + argpartition.
+    """
+    kind = "exact"
+    neighbours = None # only mmap stores ship a precomputed table
+
+    def __init__(self, vectors, ids):
+        self.vectors = np.ascontiguousarray(_normalize(vectors))
+        self.ids = np.asarray(ids)
+        self._rows = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def row_of(self, movie_id):
+        """Row for a TMDB id (None if absent). Same contract as EmbeddingStore.row_of."""
+        if self._rows is None:
+            self._rows = {int(i): r for r, i in enumerate(self.ids)}
+        return self._rows.get(int(movie_id))
+
+    def dense(self, rows):
+        return self.vectors[rows]
+
+    def search(self, query_vecs, k=50):
+        """
+        Batched top-k.
+        Returns (row_indices, scores), both shaped (n_queries, k), best first.
+        """
+        q = _normalize(query_vecs)
+        k = min(k, len(self))
+        if k == 0: return np.empty((len(q), 0), dtype=np.int64), np.empty((len(q), 0), dtype=np.float32)
+
+        scores = q @ self.vectors.T
+        if k < scores.shape[1]:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.tile(np.arange(scores.shape[1]), (len(q), 1))
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+
+class ApproxVectorIndex(VectorIndex):
+    """
+    HNSW index (optional 'hnswlib' dependency) for catalogs much bigger than tmdb_5000.
+    Same search() contract as VectorIndex.
+    """
+    kind = "hnsw"
+
+    def __init__(self, vectors, ids, ef=128, m=32):
+        import hnswlib
+
+        super().__init__(vectors, ids)
+        self._hnsw = hnswlib.Index(space="ip", dim=self.vectors.shape[1])
+        self._hnsw.init_index(max_elements=len(self.ids), ef_construction=ef * 2, M=m)
+        self._hnsw.add_items(self.vectors, np.arange(len(self.ids)))
+        self._hnsw.set_ef(ef)
+
+    def search(self, query_vecs, k=50):
+        q = _normalize(query_vecs)
+        k = min(k, len(self))
+        labels, distances = self._hnsw.knn_query(q, k=k)
+        # hnswlib 'ip' distance is 1 - dot
+        return labels.astype(np.int64), (1.0 - distances).astype(np.float32)
+
+
+def build_index(vectors, ids, approximate=None):
+    """Pick exact vs approximate. approximate=None -> decide by catalog size."""
+    if approximate is None:
+        approximate = len(ids) >= APPROX_THRESHOLD
+    if approximate:
+        try:
+            return ApproxVectorIndex(vectors, ids)
+        except ImportError:
+            print("⚠️ hnswlib not installed, falling back to exact vector index.")
+    return VectorIndex(vectors, ids)
+
+
+def embedding_matrix(embeddings, movies_df):
+    """
+    Normalize the supported movie_embeddings.pkl layouts into (ids, matrix).
+    1. ndarray / list aligned with the CSV rows.
+    2. dict {tmdb_id: vector}.
+    3. dict {"ids": [...], "embeddings": ndarray}.
+    Row-aligned layouts must have exactly one row per CSV row: a mismatch means the
+    pickle is from another CSV, and pairing them up would give movies the wrong vectors.
+    """
+    if isinstance(embeddings, dict):
+        if "embeddings" in embeddings:
+            matrix = np.asarray(embeddings["embeddings"], dtype=np.float32)
+            ids = embeddings.get("ids")
+            if ids is None: return _aligned_ids(matrix, movies_df), matrix
+            return np.asarray(ids), matrix
+        ids = list(embeddings.keys())
+        return np.asarray(ids), np.vstack([np.asarray(embeddings[i], dtype=np.float32) for i in ids])
+
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    return _aligned_ids(matrix, movies_df), matrix
+
+
+def _aligned_ids(matrix, movies_df):
+    if len(matrix) != len(movies_df):
+        raise ValueError(
+            f"Embeddings have {len(matrix)} rows but the CSV has {len(movies_df)}: "
+            "rebuild them with 'python generate_embeddings.py'."
+        )
+    return movies_df["id"].values
+
+
+def _parse_genre_ids(raw):
+    try:
+        return [g["id"] for g in json.loads(raw)]
+    except (TypeError, ValueError):
+        return []
+
+
+def movies_from_frame(movies_df):
+    """
+    Turn tmdb_5000 CSV rows into TMDB-API-shaped dicts, keyed by id.
+    Only the fields the ranker / safe-search / grid read are kept.
+    """
+    movies = {}
+    for row in movies_df.itertuples(index=False):
+        overview = row.overview if isinstance(row.overview, str) else ""
+        release_date = row.release_date if isinstance(row.release_date, str) else ""
+        movies[int(row.id)] = {
+            "id": int(row.id),
+            "title": row.title,
+            "overview": overview,
+            "release_date": release_date,
+            "popularity": float(row.popularity or 0),
+            "vote_average": float(row.vote_average or 0),
+            "vote_count": int(row.vote_count or 0),
+            "genre_ids": _parse_genre_ids(row.genres),
+            "adult": False,
+            "poster_path": None, # not in the CSV: utils.fill_posters looks it up for the grid
+            "backdrop_path": None,
+        }
+    return movies
@@ -0,0 +1,119 @@
+"""
+Background warm-up for the heavy resources (dataset, embeddings, model, engine).
+The UI renders immediately; anything that needs a resource waits on it instead of
+loading it again.
+"""
+import threading
+import time
+
+from metrics import incr, observe, register_collector
+
+# Module import ~ server process start (Streamlit keeps modules loaded across reruns)
+PROCESS_STARTED = time.perf_counter()
+
+# A failed load is retried by the next start() / wait() after this backoff (doubling per failure)
+RETRY_SECONDS = 5
+RETRY_MAX_SECONDS = 300
+
+
+class Resource:
+    """
+    One lazily built value with a ready / not-ready state.
+    The loader runs once on a daemon thread after its dependencies are ready;
+    wait() blocks callers until then and re-raises the loader's error, if any.
+    A failed resource is reset and loaded again by the first start() / wait() after its
+    backoff (RETRY_SECONDS, doubling up to RETRY_MAX_SECONDS); until then it re-raises.
+    """
+
+    def __init__(self, name, loader, deps=()):
+        self.name = name
+        self.loader = loader
+        self.deps = deps
+        self.value = None
+        self.error = None
+        self.load_seconds = None
+        self.failures = 0
+        self._retry_at = 0.0
+        self._done = threading.Event()
+        self._started = False
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self._done.is_set() and self.error is None
+
+    @property
+    def failed(self):
+        return self._done.is_set() and self.error is not None
+
+    def start(self):
+        with self._lock:
+            if self._started and not (self.failed and time.monotonic() >= self._retry_at): return self
+            if self._started:
+                print(f"🔄 Warm-up: retrying {self.name} (attempt {self.failures + 1})")
+                self.error = None
+                self._done.clear()
+            self._started = True
+        threading.Thread(target=self._run, name=f"warmup-{self.name}", daemon=True).start()
+        return self
+
+    def _run(self):
+        try:
+            args = [dep.wait() for dep in self.deps]
+            started = time.perf_counter()
+            self.value = self.loader(*args)
+            self.load_seconds = time.perf_counter() - started
+            observe("warmup_seconds", self.load_seconds, resource=self.name)
+            self.failures = 0
+            print(f"✅ Warm-up: {self.name} ready in {self.load_seconds:.2f}s")
+        except BaseException as e:
+            self.error = e
+            self.failures += 1
+            backoff = min(RETRY_SECONDS * 2 ** (self.failures - 1), RETRY_MAX_SECONDS)
+            self._retry_at = time.monotonic() + backoff
+            incr("warmup_failures", resource=self.name)
+            print(f"⚠️ Warm-up: {self.name} failed: {e} (retry in {backoff:.0f}s)")
+        finally:
+            self._done.set()
+
+    def wait(self, timeout=None):
+        self.start()
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"{self.name} still warming up")
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class Warmup:
+    """A named set of Resources started together."""
+
+    def __init__(self, *resources):
+        self.resources = {r.name: r for r in resources}
+        self.first_paint_seconds = None
+        register_collector(self._collect)
+
+    def __getitem__(self, name):
+        return self.resources[name]
+
+    def start(self):
+        for r in self.resources.values():
+            r.start()
+        return self
+
+    @property
+    def ready(self):
+        return all(r.ready for r in self.resources.values())
+
+    def status(self):
+        return {name: "ready" if r.ready else "failed" if r.failed else "loading" for name, r in self.resources.items()}
+
+    def mark_first_paint(self):
+        """Call at the end of a rerun; only the first call per process counts."""
+        if self.first_paint_seconds is None:
+            self.first_paint_seconds = time.perf_counter() - PROCESS_STARTED
+            observe("time_to_first_paint_seconds", self.first_paint_seconds)
+
+    def _collect(self):
+        for name, r in self.resources.items():
+            yield "warmup_ready", {"resource": name}, int(r.ready)